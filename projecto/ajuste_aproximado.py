@@ -0,0 +1,248 @@
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from consultas import REGIMES, load_histogram
+
+
+class Reservoir:
+    """Muestra aleatoria uniforme de tamaño fijo de un flujo de datos.
+
+    Usa el algoritmo R de Vitter: después de ver ``n`` valores, cada uno
+    está en la muestra con probabilidad ``size / n``. Los valores se
+    agregan por lotes, sin guardar el flujo completo.
+
+    Parameters
+    ----------
+    size : int
+        Tamaño máximo de la muestra.
+    seed : int, optional
+        Semilla del generador aleatorio.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.seen = 0
+        self.values = np.empty(size)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Agrega un lote de valores a la muestra."""
+        values = np.asarray(values, dtype=float).ravel()
+
+        # Llenar primero los espacios libres
+        free = min(max(self.size - self.seen, 0), len(values))
+        self.values[self.seen:self.seen + free] = values[:free]
+        self.seen += free
+        values = values[free:]
+        if len(values) == 0:
+            return
+
+        # El valor número i (contando desde 1) reemplaza a un elemento
+        # al azar con probabilidad size / i; si varios caen en el mismo
+        # lugar, queda el último, como al procesarlos uno por uno
+        positions = self.seen + 1 + np.arange(len(values))
+        slots = self.rng.integers(0, positions)
+        accepted = slots < self.size
+        self.values[slots[accepted]] = values[accepted]
+        self.seen += len(values)
+
+    @property
+    def sample(self):
+        """Valores de la muestra."""
+        return self.values[:min(self.seen, self.size)]
+
+
+def reservoir_sample(db_path="proyecto.db", size=10_000, regime=None,
+                     table="test_data", chunk_size=100_000, seed=None):
+    """Muestra uniforme de ``data`` leída por bloques de la base de datos.
+
+    Parameters
+    ----------
+    db_path : str
+        Ruta a la base de datos SQLite.
+    size : int
+        Tamaño de la muestra.
+    regime : {"day", "night"}, optional
+        Régimen de luz solar (columna ``sunlight``).
+    table : str
+        Tabla o vista de origen.
+    chunk_size : int
+        Filas leídas por bloque.
+    seed : int, optional
+        Semilla del generador aleatorio.
+
+    Returns
+    -------
+    np.ndarray
+        Hasta ``size`` muestras.
+    """
+    query, params = f"SELECT data FROM {table} WHERE data IS NOT NULL", []
+    if regime is not None:
+        query += " AND sunlight = ?"
+        params.append(REGIMES[regime])
+
+    reservoir = Reservoir(size, seed)
+    with closing(sqlite3.connect(db_path)) as conn:
+        cursor = conn.execute(query, params)
+        while rows := cursor.fetchmany(chunk_size):
+            reservoir.update(np.fromiter((row[0] for row in rows),
+                                         dtype=float, count=len(rows)))
+    return reservoir.sample
+
+
+def binned_fit(counts, edges, distribution="logistic"):
+    """Ajusta una distribución a un histograma por máxima verosimilitud.
+
+    Maximiza la verosimilitud agrupada ``Σ nᵢ·log(F(bᵢ₊₁) - F(bᵢ))``,
+    cuyo costo depende del número de intervalos y no del número de
+    muestras. El punto de partida es el ajuste exacto de una muestra
+    pequeña reconstruida con los centros de los intervalos.
+
+    Parameters
+    ----------
+    counts : array_like
+        Conteo de cada intervalo.
+    edges : array_like
+        Bordes de los intervalos (uno más que ``counts``).
+    distribution : str
+        Nombre de la distribución en ``scipy.stats``.
+
+    Returns
+    -------
+    tuple
+        Parámetros ajustados, en el orden de ``dist.fit``.
+    """
+    from scipy import optimize, stats
+
+    dist = getattr(stats, distribution)
+    counts = np.asarray(counts, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    # Punto de partida: unas 2000 muestras repartidas como el histograma
+    repeats = np.round(counts * min(1.0, 2000 / counts.sum())).astype(int)
+    start = np.array(dist.fit(np.repeat(centers, repeats)))
+    start[-1] = np.log(start[-1])
+
+    def negative_log_likelihood(theta):
+        params = (*theta[:-1], np.exp(theta[-1]))
+        probabilities = np.diff(dist.cdf(edges, *params))
+        with np.errstate(divide="ignore"):
+            log_probabilities = np.log(np.maximum(probabilities, 1e-300))
+        return -np.sum(counts * log_probabilities)
+
+    result = optimize.minimize(negative_log_likelihood, start,
+                               method="Nelder-Mead",
+                               options={"xatol": 1e-8, "fatol": 1e-8,
+                                        "maxiter": 2000})
+    return (*result.x[:-1], float(np.exp(result.x[-1])))
+
+
+def compare_fits(data, distribution="logistic", bins=200,
+                 sample_size=10_000, seed=0):
+    """Compara el ajuste exacto contra los dos ajustes aproximados.
+
+    Parameters
+    ----------
+    data : array_like
+        Todas las muestras (para el ajuste exacto).
+    distribution : str
+        Nombre de la distribución en ``scipy.stats``.
+    bins : int
+        Número de intervalos del ajuste por histograma.
+    sample_size : int
+        Tamaño de la muestra del ajuste por muestreo.
+    seed : int
+        Semilla del muestreo.
+
+    Returns
+    -------
+    pd.DataFrame
+        Por método (``exact``, ``binned``, ``reservoir``): los
+        parámetros, el tiempo, la diferencia máxima de parámetros y la
+        distancia máxima entre la CDF ajustada y la del ajuste exacto.
+    """
+    from scipy import stats
+
+    dist = getattr(stats, distribution)
+    data = np.asarray(data, dtype=float)
+    fits = {}
+
+    start = time.perf_counter()
+    fits["exact"] = (dist.fit(data), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    counts, edges = np.histogram(data, bins=bins)
+    fits["binned"] = (binned_fit(counts, edges, distribution),
+                      time.perf_counter() - start)
+
+    start = time.perf_counter()
+    reservoir = Reservoir(sample_size, seed)
+    reservoir.update(data)
+    fits["reservoir"] = (dist.fit(reservoir.sample),
+                         time.perf_counter() - start)
+
+    exact = np.array(fits["exact"][0])
+    grid = np.linspace(data.min(), data.max(), 1000)
+    exact_cdf = dist.cdf(grid, *exact)
+    rows = []
+    for method, (params, elapsed) in fits.items():
+        rows.append({
+            "method": method,
+            "params": tuple(round(float(p), 6) for p in params),
+            "seconds": elapsed,
+            "max_param_diff": np.max(np.abs(np.array(params) - exact)),
+            "max_cdf_diff": np.max(np.abs(dist.cdf(grid, *params)
+                                          - exact_cdf)),
+        })
+    return pd.DataFrame(rows).set_index("method")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ajusta una distribución a los datos de un régimen de "
+                    "forma aproximada, con un histograma o una muestra."
+    )
+    parser.add_argument("--db", default="proyecto.db")
+    parser.add_argument("--regime", choices=list(REGIMES), default="day")
+    parser.add_argument("--distribution", default="logistic")
+    parser.add_argument("--mode", choices=["binned", "reservoir"],
+                        default="binned")
+    parser.add_argument("--bins", type=int, default=200)
+    parser.add_argument("--sample-size", type=int, default=10_000)
+    parser.add_argument("--compare", action="store_true",
+                        help="Comparar con el ajuste exacto (lee todos los "
+                             "datos)")
+    args = parser.parse_args()
+
+    from scipy import stats
+
+    start = time.perf_counter()
+    if args.mode == "binned":
+        counts, edges = load_histogram(args.db, args.bins,
+                                       regime=args.regime)
+        params = binned_fit(counts, edges, args.distribution)
+    else:
+        sample = reservoir_sample(args.db, args.sample_size, args.regime)
+        params = getattr(stats, args.distribution).fit(sample)
+    elapsed = time.perf_counter() - start
+    print(f"{args.distribution} ({args.mode}): "
+          f"{tuple(round(float(p), 6) for p in params)} en {elapsed:.2f} s")
+
+    if args.compare:
+        from consultas import load_samples
+
+        data = load_samples(args.db, columns=("data",),
+                            regime=args.regime)["data"].dropna()
+        report = compare_fits(data, args.distribution, args.bins,
+                              args.sample_size)
+        print(report.to_string(float_format="{:.3g}".format))
+
+
+if __name__ == "__main__":
+    main()
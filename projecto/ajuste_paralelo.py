@@ -0,0 +1,164 @@
+import argparse
+import configparser
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from logistica import fit_logistic, pad_groups
+
+
+# Arreglos compartidos del proceso de trabajo (ver _init_worker)
+_shared = {}
+
+
+def parameter_names(distribution):
+    """Nombres de los parámetros de una distribución de ``scipy.stats``."""
+    from scipy import stats
+
+    shapes = getattr(stats, distribution).shapes
+    return [*(shapes.replace(" ", "").split(",") if shapes else []),
+            "loc", "scale"]
+
+
+def _init_worker(names, shape):
+    """Abre en cada proceso los bloques de memoria compartida."""
+    for key, name, dtype in zip(("values", "mask"), names, (float, bool)):
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        _shared[f"{key}_block"] = block
+
+
+def _fit_chunk(args):
+    """Ajusta las filas ``start:stop`` de los arreglos compartidos."""
+    distribution, start, stop = args
+    values = _shared["values"][start:stop]
+    mask = _shared["mask"][start:stop]
+    if distribution == "logistic":
+        fit = fit_logistic(values, mask)
+        return start, np.column_stack([fit.loc, fit.scale])
+
+    from scipy import stats
+
+    dist = getattr(stats, distribution)
+    return start, np.array([dist.fit(row[valid])
+                            for row, valid in zip(values, mask)])
+
+
+def fit_groups_parallel(df, distribution="logistic", by="timestamp",
+                        column="data", workers=None, chunk_size=None):
+    """Ajusta una distribución a cada grupo en un pool de procesos.
+
+    Las muestras se acomodan en un arreglo con una fila por grupo (ver
+    ``logistica.pad_groups``) que se copia una sola vez a memoria
+    compartida; cada proceso recibe solamente los índices de las filas
+    que le corresponden, no el ``DataFrame``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Datos con las columnas ``by`` y ``column``.
+    distribution : str
+        Nombre de la distribución en ``scipy.stats`` (por ejemplo,
+        ``"norm"`` o ``"expon"``). La logística usa ``fit_logistic``.
+    by : str
+        Columna que define los grupos.
+    column : str
+        Columna con las muestras.
+    workers : int, optional
+        Número de procesos; por defecto, uno por núcleo.
+    chunk_size : int, optional
+        Grupos por tarea; por defecto, cuatro tareas por proceso.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columna ``by`` y una columna por parámetro de la distribución,
+        una fila por grupo en el orden de ``by``.
+    """
+    keys, values, mask = pad_groups(df[by].to_numpy(), df[column].to_numpy())
+    names = parameter_names(distribution)
+    if len(keys) == 0:
+        return pd.DataFrame(columns=[by, *names])
+
+    workers = workers or os.cpu_count()
+    chunk_size = chunk_size or max(1, -(-len(keys) // (4 * workers)))
+
+    blocks = []
+    try:
+        for array in (values, mask):
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype,
+                       buffer=block.buf)[:] = array
+
+        results = np.empty((len(keys), len(names)))
+        jobs = [(distribution, start, min(start + chunk_size, len(keys)))
+                for start in range(0, len(keys), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=([block.name for block in blocks], values.shape),
+        ) as executor:
+            for start, params in executor.map(_fit_chunk, jobs):
+                results[start:start + len(params)] = params
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    parameters = pd.DataFrame(results, columns=names)
+    parameters.insert(0, by, keys)
+    return parameters
+
+
+def main():
+    config = configparser.ConfigParser()
+    config.read("proyecto.cfg")
+
+    parser = argparse.ArgumentParser(
+        description="Ajusta una distribución a las muestras de cada "
+                    "timestamp en paralelo."
+    )
+    parser.add_argument("--distribution", default="logistic",
+                        help="Distribución de scipy.stats")
+    parser.add_argument("--regime", choices=["day", "night"], default="day")
+    parser.add_argument("--db", default="proyecto.db")
+    parser.add_argument("--workers", type=int,
+                        default=config.getint("analisis", "workers",
+                                              fallback=None))
+    args = parser.parse_args()
+
+    from consultas import TIMESTAMP_FORMAT, load_samples
+
+    data_df = load_samples(args.db, columns=("timestamp", "data"),
+                           regime=args.regime)
+    if data_df.empty:
+        print(f"No hay muestras del régimen '{args.regime}' en {args.db}; "
+              f"no se ajustó ningún timestamp.")
+        return
+    start = time.perf_counter()
+    parameters = fit_groups_parallel(data_df, args.distribution,
+                                     workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    # Guardar los resultados en orden de timestamp
+    new_db_path = f"parameters_{args.regime}.db"
+    table = f"parameters_{args.distribution}"
+    parameters["timestamp"] = parameters["timestamp"].dt.strftime(
+        TIMESTAMP_FORMAT
+    )
+    with sqlite3.connect(new_db_path) as conn:
+        parameters.to_sql(table, conn, if_exists="replace", index=False)
+
+    print(f"{len(parameters)} timestamps ajustados en {elapsed:.2f} s; "
+          f"parámetros guardados en '{new_db_path}' (tabla '{table}').")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import configparser
+
+import numpy as np
+import pandas as pd
+
+import logistica
+
+
+# Sufijos en español de los archivos de cada régimen
+SUFFIXES = {"day": "dia", "night": "noche"}
+
+# Distribuciones candidatas de los scripts de distribución
+DISTRIBUTIONS = ['expon', 'gompertz', 'levy', 'logistic', 'norm', 'rayleigh']
+
+
+def fit_logistic_parameters(df):
+    """Ajusta una distribución logística a las muestras de cada timestamp.
+
+    Todos los timestamps se ajustan a la vez con ``logistica.fit_groups``
+    (máxima verosimilitud, igual que ``stats.logistic.fit``).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Datos con las columnas ``timestamp`` y ``data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas ``timestamp``, ``loc`` y ``scale``, una fila por timestamp.
+    """
+    if df['data'].isnull().any():
+        raise ValueError("La columna 'data' contiene valores nulos. "
+                         "Elimina o imputa los datos antes de continuar.")
+    return logistica.fit_groups(df, by='timestamp', column='data')
+
+
+def resample_mean(df, freq='10min'):
+    """Promedia los datos en intervalos de tiempo de ``freq``."""
+    return (
+        df[['timestamp', 'data']]
+        .dropna()
+        .set_index('timestamp')
+        .resample(freq)
+        .mean()
+        .reset_index()
+    )
+
+
+def _window_pairs(values, window, lag):
+    """Pares ``(x[j - lag], x[j])`` de cada ventana móvil de ``window``.
+
+    Usa ``sliding_window_view`` (vistas, sin copiar los datos); la serie
+    se rellena al inicio con NaN, de modo que las primeras ventanas son
+    más cortas. Los pares con algún NaN quedan en NaN.
+    """
+    padded = np.concatenate([np.full(window - 1, np.nan), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    current, previous = windows[:, lag:], windows[:, :-lag]
+    valid = ~(np.isnan(current) | np.isnan(previous))
+    return (np.where(valid, current, np.nan),
+            np.where(valid, previous, np.nan), valid.sum(axis=1))
+
+
+def rolling_autocorrelation(series, window=11, lag=1):
+    """Autocorrelación de retardo ``lag`` en una ventana móvil de ``window``.
+
+    La ventana de la posición ``i`` contiene las muestras de
+    ``i - window + 1`` a ``i`` (o desde el inicio de la serie), y el
+    resultado es el mismo de ``Series.autocorr(lag)`` en cada ventana
+    (NaN con menos de dos pares o sin variación). Todas las ventanas se
+    calculan a la vez sobre un arreglo ``(n, window)`` de vistas, sin
+    ciclos de Python. El tiempo es ``O(n × window)`` y no ``O(n)``: cada
+    ventana se centra en sus propias medias antes de sumar, así que el
+    error no crece con la serie ni con los cambios de nivel. Con sumas
+    acumuladas (``O(n)``), la diferencia de dos sumas grandes pierde
+    precisión (del orden de 1e-5 relativo en series con cambios de
+    nivel).
+
+    Parameters
+    ----------
+    series : pd.Series
+        Serie de tiempo (puede tener NaN).
+    window : int
+        Número de muestras de cada ventana.
+    lag : int
+        Retardo, menor que ``window``.
+
+    Returns
+    -------
+    pd.Series
+        Autocorrelación de cada ventana, con el índice de ``series``.
+    """
+    values = series.to_numpy(dtype=float)
+    if lag >= min(window, len(values)):
+        return pd.Series(np.nan, index=series.index, dtype=float)
+
+    current, previous, pairs = _window_pairs(values, window, lag)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        current = current - (np.nansum(current, axis=1) / pairs)[:, None]
+        previous = previous - (np.nansum(previous, axis=1)
+                               / pairs)[:, None]
+        var_c = np.nansum(current ** 2, axis=1)
+        var_p = np.nansum(previous ** 2, axis=1)
+        autocorrelation = (np.nansum(current * previous, axis=1)
+                           / np.sqrt(var_c * var_p))
+    # Una ventana constante deja varianzas del orden del error de
+    # redondeo de su media
+    scale = np.nanmax(np.abs(values), initial=0) ** 2
+    tolerance = 1e3 * np.finfo(float).eps ** 2 * scale * pairs
+    degenerate = (pairs < 2) | (var_c <= tolerance) | (var_p <= tolerance)
+    autocorrelation[degenerate] = np.nan
+    return pd.Series(np.clip(autocorrelation, -1, 1), index=series.index)
+
+
+def rolling_autocorrelations(series, window=11, lags=(1,)):
+    """``rolling_autocorrelation`` de varios retardos.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columna ``autocorrelation`` con el primer retardo y una columna
+        ``autocorrelation_lag<k>`` por cada uno de los demás.
+    """
+    columns = {}
+    for k in lags:
+        name = 'autocorrelation' if not columns else f'autocorrelation_lag{k}'
+        columns[name] = rolling_autocorrelation(series, window, k)
+    return pd.DataFrame(columns, index=series.index)
+
+
+def autocorrelation_options(path='proyecto.cfg'):
+    """Ventana y retardos de la autocorrelación móvil de ``[analisis]``.
+
+    Las opciones son ``autocorrelation_window`` (por defecto 11) y
+    ``autocorrelation_lags``, separados por comas (por defecto 1).
+    """
+    config = configparser.ConfigParser()
+    config.read(path)
+    window = config.getint('analisis', 'autocorrelation_window', fallback=11)
+    lags = config.get('analisis', 'autocorrelation_lags', fallback='1')
+    return window, tuple(int(lag) for lag in lags.split(','))
+
+
+def minutes_from_midnight(timestamps, regime='day'):
+    """Minutos desde la medianoche; de noche, ajustados desde las 18:00.
+
+    Para el régimen nocturno, los minutos antes de las 18:00 se desplazan
+    un día (1440 minutos) para que la noche sea un intervalo continuo.
+    """
+    minutes = (timestamps.dt.hour * 60 + timestamps.dt.minute
+               + timestamps.dt.second / 60)
+    if regime == 'night':
+        minutes = minutes.where(minutes >= 1080, minutes + 1440)
+    return minutes
+
+
+def fit_quadratic_trends(parameters, regime='day'):
+    """Ajusta polinomios de segundo grado a ``loc`` y ``scale`` en el tiempo.
+
+    Parameters
+    ----------
+    parameters : pd.DataFrame
+        Columnas ``timestamp``, ``loc`` y ``scale``.
+    regime : {"day", "night"}
+        Régimen, para el intervalo de tiempo (06:00-18:00 o 18:00-06:00).
+
+    Returns
+    -------
+    tuple
+        Los minutos filtrados, el ``DataFrame`` filtrado y un diccionario
+        con los coeficientes de ``loc`` y de ``scale``.
+    """
+    timestamps = pd.to_datetime(parameters['timestamp'])
+    minutes = minutes_from_midnight(timestamps, regime)
+    if regime == 'night':
+        mask = (minutes >= 1080) & (minutes < 1800)
+    else:
+        mask = (minutes >= 360) & (minutes <= 1080)
+    filtered = parameters[mask]
+    minutes = minutes[mask]
+    coefficients = {
+        column: np.polyfit(minutes, filtered[column], 2)
+        for column in ('loc', 'scale')
+    }
+    return minutes, filtered, coefficients
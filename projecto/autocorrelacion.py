@@ -0,0 +1,273 @@
+import argparse
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from ergodicidad import MEMBERS_QUERY
+from logistica import pad_groups
+from particiones import REGIME_VIEWS, connect
+
+# Retardo máximo por defecto, en muestras
+DEFAULT_MAX_LAG = 360
+
+# Realización cuya serie de tiempo se analiza por defecto
+DEFAULT_MEMBER = 0
+
+# Desfase con que se fecha cada noche: las muestras de 18:00 a 06:00
+# quedan con la fecha del día en que empieza la noche
+NIGHT_OFFSET = pd.Timedelta(hours=12)
+
+
+def acf_fft(values, mask=None, max_lag=DEFAULT_MAX_LAG):
+    """Autocovarianza y autocorrelación de cada fila, con la FFT.
+
+    Por el teorema de Wiener-Khinchin, la autocovarianza es la
+    transformada inversa de ``|X(f)|²``. Cada fila se centra en su media
+    y se rellena con ceros hasta al menos el doble de su longitud, de
+    modo que la convolución no es circular; el costo es ``O(n log n)``
+    por fila y todas las filas se transforman a la vez.
+
+    Parameters
+    ----------
+    values : array_like
+        Arreglo ``(series, muestras)``, o una sola serie.
+    mask : array_like, optional
+        Posiciones con muestra (ver ``logistica.pad_groups``); las
+        series más cortas deben estar rellenadas al final.
+    max_lag : int
+        Retardo máximo.
+
+    Returns
+    -------
+    tuple
+        La autocovarianza sesgada (dividida entre el número de muestras
+        de la serie, como en la densidad espectral) y la autocorrelación,
+        ambas ``(series, max_lag + 1)``, con NaN en los retardos que no
+        caben en la serie.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    mask = (np.ones(values.shape, dtype=bool) if mask is None
+            else np.atleast_2d(mask))
+    counts = mask.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        means = np.where(mask, values, 0).sum(axis=1) / counts
+    centered = np.where(mask, values - means[:, np.newaxis], 0)
+
+    size = 1 << int(np.ceil(np.log2(max(2 * values.shape[1] - 1, 1))))
+    spectrum = np.fft.rfft(centered, size, axis=1)
+    lags = min(max_lag + 1, values.shape[1])
+    products = np.fft.irfft(np.abs(spectrum) ** 2, size, axis=1)[:, :lags]
+
+    autocovariance = np.full((len(values), max_lag + 1), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        autocovariance[:, :lags] = products / counts[:, np.newaxis]
+    autocovariance[np.arange(max_lag + 1) >= counts[:, np.newaxis]] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        autocorrelation = autocovariance / autocovariance[:, :1]
+    return autocovariance, autocorrelation
+
+
+def psd_from_autocovariance(autocovariance, dT):
+    """Densidad espectral de potencia a partir de la autocovarianza.
+
+    Con la autocovarianza sesgada de todos los retardos (``max_lag`` igual
+    al número de muestras menos uno), el resultado es exactamente
+    ``|FFT(x)|² / (n dT)`` de la serie centrada, en las frecuencias de
+    ``np.fft.fftfreq(n, d=dT)``; sirve para verificar la densidad
+    espectral del script de densidad espectral.
+
+    Returns
+    -------
+    tuple
+        Las frecuencias y la densidad espectral.
+    """
+    gamma = np.asarray(autocovariance, dtype=float)
+    n = len(gamma)
+    # Retardos negativos plegados sobre los positivos, módulo n
+    folded = gamma.copy()
+    folded[1:] += gamma[:0:-1]
+    return np.fft.fftfreq(n, d=dT), np.fft.fft(folded).real / dT
+
+
+def load_series(db_path="proyecto.db", regime="day", member=DEFAULT_MEMBER):
+    """Serie de tiempo de una realización del régimen (ver ``ergodicidad``).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas ``timestamp`` (como texto) y ``data``, en orden de
+        timestamp.
+    """
+    view, _ = REGIME_VIEWS[regime]
+    query = (f"SELECT timestamp, data FROM ({MEMBERS_QUERY.format(view=view)})"
+             f" WHERE member = ? ORDER BY timestamp")
+    with closing(connect(db_path)) as conn:
+        return pd.read_sql_query(query, conn, params=[member])
+
+
+def sample_spacing(timestamps):
+    """Intervalo de muestreo (mediana de las diferencias) en segundos."""
+    differences = pd.to_datetime(pd.Series(timestamps)).diff().dropna()
+    return differences.median().total_seconds()
+
+
+def contiguous_pieces(timestamps, spacing=None):
+    """Número de tramo contiguo de cada muestra.
+
+    Un tramo nuevo empieza donde la diferencia con la muestra anterior es
+    mayor que el intervalo de muestreo (con un margen de la mitad), por
+    ejemplo entre dos días del mismo régimen o donde faltan muestras.
+
+    Parameters
+    ----------
+    timestamps : array_like
+        Fechas en orden.
+    spacing : float, optional
+        Intervalo de muestreo en segundos; por defecto,
+        ``sample_spacing(timestamps)``.
+
+    Returns
+    -------
+    np.ndarray
+        Número de tramo (desde 0) de cada muestra.
+    """
+    timestamps = pd.to_datetime(pd.Series(timestamps))
+    if spacing is None:
+        spacing = sample_spacing(timestamps)
+    gaps = timestamps.diff().dt.total_seconds().to_numpy() > 1.5 * spacing
+    return np.cumsum(gaps)
+
+
+def acf_table(series, regime, max_lag=DEFAULT_MAX_LAG):
+    """ACF de la serie completa del régimen y de cada día (o noche).
+
+    La serie se separa en tramos contiguos (``contiguous_pieces``), para
+    que ningún retardo cruce un hueco, y todos los tramos se acomodan en
+    un arreglo con una fila por tramo (``pad_groups``) que se transforma
+    de una vez en ``acf_fft``. La autocovarianza de un día y la de la
+    serie completa (``"all"``) combinan las de sus tramos: la suma de los
+    productos de cada retardo, cada tramo centrado en su media, entre el
+    número de muestras. Las noches se agrupan por la fecha en que
+    empiezan (``NIGHT_OFFSET``), no por fecha calendario.
+
+    Parameters
+    ----------
+    series : pd.DataFrame
+        Columnas ``timestamp`` y ``data`` (ver ``load_series``).
+    regime : str
+        Régimen, para la columna ``regime`` y la fecha de cada noche.
+    max_lag : int
+        Retardo máximo.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas ``regime``, ``day`` (``"all"`` para la serie completa),
+        ``lag``, ``seconds``, ``samples``, ``autocovariance`` y
+        ``autocorrelation``, una fila por día y retardo.
+    """
+    series = series.dropna(subset=["data"])
+    timestamps = pd.to_datetime(series["timestamp"]).reset_index(drop=True)
+    spacing = sample_spacing(timestamps)
+    piece_of = contiguous_pieces(timestamps, spacing)
+    pieces, values, mask = pad_groups(piece_of, series["data"].to_numpy())
+    counts = mask.sum(axis=1)
+    autocovariance, _ = acf_fft(values, mask, max_lag)
+    products = np.nan_to_num(autocovariance) * counts[:, np.newaxis]
+
+    # Día (o noche) de cada tramo, por su primera muestra
+    offset = NIGHT_OFFSET if regime == "night" else pd.Timedelta(0)
+    first = timestamps.groupby(piece_of).first()
+    days, day_of_piece = np.unique(
+        (first - offset).dt.strftime("%Y-%m-%d").to_numpy(),
+        return_inverse=True,
+    )
+
+    labels = np.concatenate([["all"], days])
+    groups = np.concatenate([np.zeros(len(pieces), dtype=int),
+                             day_of_piece + 1])
+    totals = np.zeros((len(labels), max_lag + 1))
+    np.add.at(totals, groups, np.concatenate([products, products]))
+    samples = np.bincount(groups, np.concatenate([counts, counts]),
+                          minlength=len(labels))
+    longest = np.zeros(len(labels))
+    np.maximum.at(longest, groups, np.concatenate([counts, counts]))
+
+    lags = np.arange(max_lag + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = totals / samples[:, np.newaxis]
+    gamma[lags >= longest[:, np.newaxis]] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = gamma / gamma[:, :1]
+    table = pd.DataFrame({
+        "regime": regime,
+        "day": np.repeat(labels, len(lags)),
+        "lag": np.tile(lags, len(labels)),
+        "seconds": np.tile(lags * spacing, len(labels)),
+        "samples": np.repeat(samples.astype(int), len(lags)),
+        "autocovariance": gamma.ravel(),
+        "autocorrelation": rho.ravel(),
+    })
+    return table.dropna(subset=["autocovariance"]).reset_index(drop=True)
+
+
+def check_psd(series):
+    """Compara la PSD de Wiener-Khinchin con la del periodograma.
+
+    Calcula la autocovarianza de todos los retardos con ``acf_fft`` y la
+    densidad espectral con ``psd_from_autocovariance``, y la compara con
+    ``|FFT(x)|² / (n dT)``, como en el script de densidad espectral (sin
+    la frecuencia cero, la única que cambia al centrar la serie).
+
+    Returns
+    -------
+    float
+        Máxima diferencia relativa entre ambas densidades.
+    """
+    values = series["data"].dropna().to_numpy(dtype=float)
+    n = len(values)
+    dT = sample_spacing(series["timestamp"])
+    autocovariance, _ = acf_fft(values, max_lag=n - 1)
+    _, psd = psd_from_autocovariance(autocovariance[0], dT)
+    periodogram = np.abs(np.fft.fft(values)) ** 2 / (n * dT)
+    return np.max(np.abs(psd[1:] - periodogram[1:])) / periodogram.max()
+
+
+def save_acf(table, db_path):
+    """Guarda la tabla ``acf``, reemplazándola."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        table.to_sql("acf", conn, if_exists="replace", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calcula con la FFT la función de autocorrelación de un "
+                    "régimen y de cada día, y la guarda en "
+                    "estacionalidad_<régimen>.db."
+    )
+    parser.add_argument("--regime", choices=list(REGIME_VIEWS),
+                        default="day")
+    parser.add_argument("--db", default="proyecto.db")
+    parser.add_argument("--max-lag", type=int, default=DEFAULT_MAX_LAG,
+                        help="Retardo máximo, en muestras")
+    parser.add_argument("--member", type=int, default=DEFAULT_MEMBER,
+                        help="Realización cuya serie se analiza")
+    parser.add_argument("--check", action="store_true",
+                        help="Verificar la PSD con la autocovarianza")
+    args = parser.parse_args()
+
+    series = load_series(args.db, args.regime, args.member)
+    table = acf_table(series, args.regime, args.max_lag)
+    db_path = f"estacionalidad_{args.regime}.db"
+    save_acf(table, db_path)
+    print(f"ACF de {table['day'].nunique() - 1} días hasta el retardo "
+          f"{args.max_lag} guardada en la tabla 'acf' de {db_path}")
+    if args.check:
+        print(f"Diferencia relativa máxima con el periodograma: "
+              f"{check_psd(series):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from estadisticas import RunningMoments, merge_running_stats, time_bucket
+from ingesta import (
+    build_packed_record, build_records, bulk_insert, stored_keys,
+    write_packed
+)
+from models import PackedData, TestData, get_engine, session_scope
+
+
+# Una respuesta archivada, lista para escribir: su llave ``(group,
+# timestamp)``, sus filas y el acumulador de momentos de su llave de
+# running_stats
+Realization = namedtuple("Realization",
+                         ["key", "records", "stats_key", "moments"])
+
+
+def parse_file(path, group, storage="rows"):
+    """Lee un archivo JSON guardado de la API y construye sus filas.
+
+    El archivo puede tener una respuesta (como la que procesa
+    ``test_task``) o una lista de respuestas.
+
+    Parameters
+    ----------
+    path : str
+        Ruta al archivo JSON.
+    group : str
+        Número de grupo al que pertenecen los datos.
+    storage : {"rows", "packed"}
+        Formato de las filas construidas.
+
+    Returns
+    -------
+    list of Realization
+        Una por respuesta del archivo.
+    """
+    with open(path) as file:
+        content = json.load(file)
+    responses = content if isinstance(content, list) else [content]
+
+    realizations = []
+    for data in responses:
+        if storage == "packed":
+            records = [build_packed_record(data, group)]
+        else:
+            records = build_records(data, group)
+        realizations.append(Realization(
+            key=(group, records[0]["timestamp"]) if records else None,
+            records=records,
+            stats_key=(group, bool(data["sunlight"]),
+                       time_bucket(data["timestamp"])),
+            moments=RunningMoments.from_values(
+                data["data"][:data["sample_size"]]),
+        ))
+    return realizations
+
+
+def _parse(args):
+    """Envoltura de ``parse_file`` para ``ProcessPoolExecutor.map``."""
+    path, group, storage = args
+    try:
+        return parse_file(path, group, storage)
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"No fue posible leer {path}: {e}")
+        return []
+
+
+def write_batch(realizations, engine, storage="rows"):
+    """Escribe un lote de realizaciones y sus momentos en una transacción.
+
+    Las realizaciones que ya están guardadas (por ejemplo, al repetir la
+    carga o si coincide con la ingesta en vivo) y las repetidas dentro del
+    lote se descartan antes de escribir, así que ni las filas ni los
+    acumuladores de ``running_stats`` se duplican.
+
+    Returns
+    -------
+    int
+        Número de filas escritas.
+    """
+    model = PackedData if storage == "packed" else TestData
+    write = write_packed if storage == "packed" else bulk_insert
+    with session_scope() as session:
+        stored = stored_keys(session, model,
+                             {r.key for r in realizations if r.key})
+        records, moments, seen = [], {}, set()
+        for r in realizations:
+            if r.key is None or r.key in stored or r.key in seen:
+                continue
+            seen.add(r.key)
+            records.extend(r.records)
+            moments[r.stats_key] = moments.get(
+                r.stats_key, RunningMoments()).merge(r.moments)
+        write(records, engine, session)
+
+        # Actualizar los momentos acumulados una sola vez por llave
+        for key, batch in moments.items():
+            merge_running_stats(session, key, batch)
+    return len(records)
+
+
+def backfill(paths, group, storage="rows", workers=None, batch_size=100_000):
+    """Carga en la base de datos un conjunto de respuestas archivadas.
+
+    Los archivos se leen en paralelo en un pool de procesos y las filas
+    se escriben en lotes de unas ``batch_size`` filas, cada lote con sus
+    momentos en una sola transacción (ver ``write_batch``).
+
+    Parameters
+    ----------
+    paths : list of str
+        Archivos JSON a cargar.
+    group : str
+        Número de grupo al que pertenecen los datos.
+    storage : {"rows", "packed"}
+        Tabla de destino: test_data o packed_data.
+    workers : int, optional
+        Número de procesos; por defecto, uno por núcleo.
+    batch_size : int
+        Número de filas por transacción.
+
+    Returns
+    -------
+    int
+        Número de filas escritas.
+    """
+    engine = get_engine()
+    pending, rows, written = [], 0, 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = ((str(path), group, storage) for path in paths)
+        for realizations in executor.map(_parse, jobs, chunksize=16):
+            pending.extend(realizations)
+            rows += sum(len(r.records) for r in realizations)
+            if rows >= batch_size:
+                written += write_batch(pending, engine, storage)
+                pending, rows = [], 0
+    written += write_batch(pending, engine, storage)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Carga respuestas archivadas de la API en la base "
+                    "de datos."
+    )
+    parser.add_argument("directory", help="Directorio con archivos JSON")
+    parser.add_argument("--group", required=True,
+                        help="Número de grupo de los datos")
+    parser.add_argument("--pattern", default="*.json",
+                        help="Patrón de los archivos a cargar")
+    parser.add_argument("--storage", choices=["rows", "packed"],
+                        default="rows")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+    paths = sorted(Path(args.directory).rglob(args.pattern))
+    start = time.perf_counter()
+    written = backfill(paths, args.group, args.storage, args.workers,
+                       args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(paths)} archivos, {written} filas en {elapsed:.2f} s "
+          f"({len(paths) / elapsed:.0f} archivos/s, "
+          f"{written / elapsed:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Módulos que cargan los workers de Celery y los scripts de análisis
+MODULES = ["models", "ingesta", "tasks", "proyecto_avance_graficas",
+           "proyecto_avance_momentos", "consultas"]
+
+
+def time_command(code, repeat=5):
+    """Mide la mediana del tiempo de ejecutar ``code`` en un proceso nuevo.
+
+    Parameters
+    ----------
+    code : str
+        Código de Python a ejecutar con ``python -c``.
+    repeat : int
+        Número de repeticiones.
+
+    Returns
+    -------
+    float
+        Mediana del tiempo de ejecución, en segundos.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mide el tiempo de arranque de los módulos del proyecto."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    baseline = time_command("pass", args.repeat)
+    print(f"{'intérprete':<28}{baseline * 1000:8.1f} ms")
+    for module in args.modules:
+        elapsed = time_command(f"import {module}", args.repeat)
+        print(f"{'import ' + module:<28}{elapsed * 1000:8.1f} ms")
+
+    # Costo de la primera conexión (lectura de la configuración, engine
+    # y creación del esquema), que ahora se paga solo al usar la base
+    elapsed = time_command("import models; models.get_engine()", args.repeat)
+    print(f"{'models.get_engine()':<28}{elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
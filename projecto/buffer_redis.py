@@ -0,0 +1,171 @@
+import json
+import os
+
+import redis
+
+
+# Cliente de Redis del proceso (se recrea después de un fork)
+_client = None
+_client_pid = None
+
+
+def get_client(url="redis://localhost"):
+    """Devuelve el cliente de Redis del proceso.
+
+    Parameters
+    ----------
+    url : str
+        URL del servidor de Redis.
+
+    Returns
+    -------
+    redis.Redis
+        Cliente con su propio pool de conexiones.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client, _client_pid = redis.Redis.from_url(url), os.getpid()
+    return _client
+
+
+def push(client, key, responses):
+    """Agrega respuestas de la API al final de la lista de Redis.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        Cliente de Redis.
+    key : str
+        Nombre de la lista.
+    responses : list of tuple
+        Pares ``(group, data)`` con las respuestas decodificadas.
+
+    Returns
+    -------
+    int
+        Largo de la lista después de agregar las respuestas.
+    """
+    if not responses:
+        return client.llen(key)
+    payloads = [
+        json.dumps({"group": group, "data": data})
+        for group, data in responses
+    ]
+    return client.rpush(key, *payloads)
+
+
+def processing_key(key):
+    """Nombre de la lista con las respuestas que se están escribiendo."""
+    return f"{key}:processing"
+
+
+def pop_batch(client, key, size):
+    """Mueve de forma atómica hasta ``size`` respuestas a la lista de proceso.
+
+    Cada respuesta pasa del inicio de ``key`` al final de la lista de
+    proceso con ``LMOVE``, todas en una sola transacción. Ahí permanecen
+    hasta que ``ack`` las borra, después de escribirlas; si el *worker*
+    termina antes, ``recover`` las devuelve a ``key``.
+
+    Returns
+    -------
+    tuple
+        Los pares ``(group, data)`` en el orden en que fueron agregados, y
+        los mensajes tal como están en Redis (para ``ack``).
+    """
+    pipeline = client.pipeline(transaction=True)
+    for _ in range(size):
+        pipeline.lmove(key, processing_key(key), "LEFT", "RIGHT")
+    payloads = [payload for payload in pipeline.execute()
+                if payload is not None]
+    batch = [
+        (payload["group"], payload["data"])
+        for payload in map(json.loads, payloads)
+    ]
+    return batch, payloads
+
+
+def ack(client, key, payloads):
+    """Borra de la lista de proceso las respuestas ya escritas."""
+    if payloads:
+        pipeline = client.pipeline(transaction=True)
+        for payload in payloads:
+            pipeline.lrem(processing_key(key), 1, payload)
+        pipeline.execute()
+
+
+def recover(client, key):
+    """Devuelve al inicio de ``key`` las respuestas de la lista de proceso.
+
+    Son las de un lote que falló o que quedó a medias (por ejemplo, si el
+    *worker* terminó antes de ``ack``); conservan su orden.
+
+    Returns
+    -------
+    int
+        Número de respuestas recuperadas.
+    """
+    recovered = 0
+    while client.lmove(processing_key(key), key, "RIGHT", "LEFT") is not None:
+        recovered += 1
+    return recovered
+
+
+def drain(client, key, size, store, lock_timeout=600):
+    """Vacía la lista en lotes de ``size`` respuestas.
+
+    Termina con el primer lote incompleto, para no quedarse escribiendo
+    indefinidamente mientras siguen llegando respuestas. Un solo vaciado
+    se ejecuta a la vez (con un candado de Redis); al comenzar, recupera
+    las respuestas que un vaciado anterior dejó sin confirmar. Cada lote
+    se confirma con ``ack`` solamente después de que ``store`` termina,
+    así que ninguna respuesta se pierde; ``store`` debe ignorar las que
+    ya estén guardadas, porque un lote escrito pero no confirmado se
+    vuelve a escribir.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        Cliente de Redis.
+    key : str
+        Nombre de la lista.
+    size : int
+        Número máximo de respuestas por lote.
+    store : callable
+        Función que escribe un lote de pares ``(group, data)`` en la base
+        de datos. Si falla, el lote vuelve a la lista y se propaga el
+        error.
+    lock_timeout : float
+        Segundos tras los cuales el candado expira, por si el *worker*
+        que lo tiene termina sin liberarlo.
+
+    Returns
+    -------
+    int
+        Número de respuestas escritas (0 si otro vaciado está en curso).
+    """
+    lock = client.lock(f"{key}:lock", timeout=lock_timeout)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        recover(client, key)
+        written = 0
+        while True:
+            batch, payloads = pop_batch(client, key, size)
+            if not batch:
+                return written
+            try:
+                store(batch)
+            except Exception:
+                recover(client, key)
+                raise
+            ack(client, key, payloads)
+            written += len(batch)
+            if len(batch) < size:
+                return written
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # El candado expiró; otro vaciado pudo haberlo tomado
+            pass
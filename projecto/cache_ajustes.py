@@ -0,0 +1,108 @@
+import configparser
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+class FitCache:
+    """Caché en disco de los resultados de ``select_model``.
+
+    Cada entrada es un archivo JSON con los parámetros, las métricas de
+    bondad de ajuste y el estado de cada distribución, con un nombre que
+    es el hash de los datos y de las opciones del ajuste. Cuando el
+    tamaño total de las entradas supera ``max_bytes``, se eliminan las
+    usadas hace más tiempo (la fecha de modificación del archivo se
+    actualiza en cada lectura).
+
+    Parameters
+    ----------
+    directory : str
+        Directorio de las entradas; se crea si no existe.
+    max_bytes : int
+        Tamaño máximo del caché en bytes.
+    """
+
+    def __init__(self, directory=".cache_ajustes", max_bytes=64 * 2**20):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(data, distributions, **options):
+        """Hash de los datos, de las distribuciones y de las opciones.
+
+        Los datos se ordenan antes del hash, porque el ajuste no depende
+        del orden de las muestras (por ejemplo, al leerlas por timestamp
+        o por ``id``). Cada función que guarda entradas pasa su nombre en
+        la opción ``producer``, porque los formatos de sus entradas no
+        son intercambiables.
+        """
+        values = np.sort(np.asarray(data, dtype="<f8"), axis=None)
+        digest = hashlib.sha256(values.tobytes())
+        digest.update(json.dumps([list(distributions), options],
+                                 sort_keys=True, default=repr).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        """Devuelve la entrada de ``key``, o ``None`` si no existe."""
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        """Guarda una entrada y aplica el límite de tamaño."""
+        # Escribir en un archivo temporal y renombrarlo, para que otro
+        # proceso nunca lea una entrada a medias
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(entry, file)
+        os.replace(temporary, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta cumplir ``max_bytes``."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def size(self):
+        """Tamaño total de las entradas en bytes."""
+        return sum(path.stat().st_size
+                   for path in self.directory.glob("*.json"))
+
+
+def default_cache(path="proyecto.cfg"):
+    """Crea el caché con las opciones de la sección ``[analisis]``.
+
+    Las opciones son ``cache_dir`` (por defecto ``.cache_ajustes``) y
+    ``cache_size`` en MB (por defecto 64).
+    """
+    config = configparser.ConfigParser()
+    config.read(path)
+    directory = config.get("analisis", "cache_dir",
+                           fallback=".cache_ajustes")
+    size = config.getfloat("analisis", "cache_size", fallback=64)
+    return FitCache(directory, int(size * 2**20))
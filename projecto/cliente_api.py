@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Sesiones HTTP del proceso por tamaño de pool (se recrean después de un
+# fork)
+_sessions = {}
+_sessions_pid = None
+
+
+def get_session(pool_size=10):
+    """Devuelve la sesión HTTP del proceso, con conexiones reutilizables.
+
+    La sesión mantiene abiertas hasta ``pool_size`` conexiones por
+    servidor (*keep-alive*). Hay una sesión por cada ``pool_size``, de
+    modo que pedir un pool más grande no reutiliza uno más pequeño. Cada
+    proceso de Celery crea las suyas, porque las conexiones no deben
+    compartirse entre procesos.
+
+    Parameters
+    ----------
+    pool_size : int
+        Número máximo de conexiones abiertas por servidor.
+
+    Returns
+    -------
+    requests.Session
+        Sesión con el *pool* de conexiones.
+    """
+    global _sessions_pid
+    if _sessions_pid != os.getpid():
+        _sessions.clear()
+        _sessions_pid = os.getpid()
+    if pool_size not in _sessions:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[pool_size] = session
+    return _sessions[pool_size]
+
+
+def fetch(url, group, timeout=(3.05, 10), session=None):
+    """Descarga una respuesta de la API para un grupo.
+
+    Parameters
+    ----------
+    url : str
+        URL de la API.
+    group : str
+        Número de grupo del proyecto.
+    timeout : float or tuple
+        Tiempo máximo de conexión y de lectura, en segundos.
+    session : requests.Session, optional
+        Sesión a utilizar; por defecto la del proceso.
+
+    Returns
+    -------
+    dict or None
+        Respuesta decodificada, o ``None`` si la solicitud falló o la
+        respuesta no es JSON válido.
+    """
+    session = session or get_session()
+    params = {"grupo": int(group)}
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        logging.error(f"Error en la solicitud del grupo {group}: {e}")
+        return None
+
+    if response.status_code == 200:
+        try:
+            return json.loads(response.text)
+        except ValueError as e:
+            logging.error(f"Respuesta inválida del grupo {group}: {e}")
+            return None
+    logging.error(f"Error {response.status_code}: {response.text}")
+    return None
+
+
+def fetch_many(url, groups, timeout=(3.05, 10), concurrency=8):
+    """Descarga simultáneamente las respuestas de varios grupos.
+
+    Las solicitudes se reparten entre ``concurrency`` hilos que comparten
+    el *pool* de conexiones de la sesión del proceso.
+
+    Parameters
+    ----------
+    url : str
+        URL de la API.
+    groups : list of str
+        Números de grupo a consultar.
+    timeout : float or tuple
+        Tiempo máximo de conexión y de lectura, en segundos.
+    concurrency : int
+        Número máximo de solicitudes en curso al mismo tiempo.
+
+    Returns
+    -------
+    list of tuple
+        Pares ``(group, data)`` en el orden de ``groups``; ``data`` es
+        ``None`` si la solicitud de ese grupo falló.
+    """
+    session = get_session(pool_size=concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(
+            lambda group: fetch(url, group, timeout, session), groups
+        )
+        return list(zip(groups, results))
+
+
+def benchmark(n_requests=400, concurrency=16, delay=0.02):
+    """Mide el rendimiento del cliente contra el servidor local de prueba.
+
+    Compara solicitudes secuenciales con conexiones nuevas (el
+    comportamiento original de ``test_task``) contra ``fetch_many`` con
+    el *pool* de conexiones, e imprime solicitudes por segundo y las
+    latencias p50, p95 y p99.
+    """
+    import statistics
+
+    from servidor_api import start_server
+
+    server, url = start_server(delay=delay)
+    groups = [str(i % 1000) for i in range(n_requests)]
+
+    def timed(function, group):
+        start = time.perf_counter()
+        function(group)
+        return time.perf_counter() - start
+
+    def report(name, latencies, elapsed):
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{name}: {len(latencies) / elapsed:.0f} sol/s, "
+            f"p50 {quantiles[49] * 1000:.1f} ms, "
+            f"p95 {quantiles[94] * 1000:.1f} ms, "
+            f"p99 {quantiles[98] * 1000:.1f} ms"
+        )
+
+    try:
+        start = time.perf_counter()
+        latencies = [
+            timed(lambda g: requests.get(url, params={"grupo": int(g)}), g)
+            for g in groups
+        ]
+        report("secuencial", latencies, time.perf_counter() - start)
+
+        session = get_session(pool_size=concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(
+                lambda g: timed(lambda x: fetch(url, x, session=session), g),
+                groups,
+            ))
+        report("pool", latencies, time.perf_counter() - start)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,186 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime, time
+
+import pandas as pd
+
+
+# Columnas que es posible seleccionar de test_data
+COLUMNS = ("id", "group", "timestamp", "data", "sunlight")
+
+# Regímenes de luz solar y su valor en la columna sunlight
+REGIMES = {"day": 1, "night": 0}
+
+# Formato en que SQLAlchemy guarda las fechas en SQLite
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _as_timestamp(value):
+    """Convierte una fecha al formato de texto guardado en SQLite."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def _as_time(value):
+    """Convierte una hora del día al formato ``HH:MM:SS``."""
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.strftime("%H:%M:%S")
+
+
+def build_query(columns=("timestamp", "data"), start=None, end=None,
+                regime=None, time_from=None, time_to=None,
+                table="test_data"):
+    """Construye la consulta SQL con filtros y proyección.
+
+    Parameters
+    ----------
+    columns : sequence of str
+        Columnas a seleccionar (subconjunto de ``COLUMNS``).
+    start, end : datetime or str, optional
+        Rango de fechas, inclusivo en ambos extremos.
+    regime : {"day", "night"}, optional
+        Régimen de luz solar (columna ``sunlight``).
+    time_from, time_to : time or str, optional
+        Rango de hora del día, inclusivo. Si ``time_from`` es mayor que
+        ``time_to`` el rango cruza la medianoche (por ejemplo, de 18:00 a
+        06:00).
+    table : str
+        Tabla o vista de origen, con la columna ``id`` de test_data.
+
+    Returns
+    -------
+    tuple
+        La consulta SQL y la lista de parámetros. Si se selecciona
+        ``timestamp``, las filas se ordenan por ``timestamp`` e ``id``.
+    """
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {sorted(unknown)}")
+    if regime is not None and regime not in REGIMES:
+        raise ValueError(f"Régimen desconocido: {regime}")
+
+    conditions, params = [], []
+    if regime is not None:
+        conditions.append("sunlight = ?")
+        params.append(REGIMES[regime])
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        params.append(_as_timestamp(start))
+    if end is not None:
+        conditions.append("timestamp <= ?")
+        params.append(_as_timestamp(end))
+    if time_from is not None and time_to is not None:
+        operator = "AND" if _as_time(time_from) <= _as_time(time_to) else "OR"
+        conditions.append(
+            f"(time(timestamp) >= ? {operator} time(timestamp) <= ?)"
+        )
+        params.extend([_as_time(time_from), _as_time(time_to)])
+    elif time_from is not None:
+        conditions.append("time(timestamp) >= ?")
+        params.append(_as_time(time_from))
+    elif time_to is not None:
+        conditions.append("time(timestamp) <= ?")
+        params.append(_as_time(time_to))
+
+    selected = ", ".join(f'"{column}"' for column in columns)
+    query = f"SELECT {selected} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if "timestamp" in columns:
+        # Desempate por id: el orden de las muestras de un mismo
+        # timestamp (y el número de realización) no cambia entre corridas
+        query += " ORDER BY timestamp, id"
+    return query, params
+
+
+def load_samples(db_path="proyecto.db", columns=("timestamp", "data"),
+                 start=None, end=None, regime=None, time_from=None,
+                 time_to=None, table="test_data"):
+    """Carga en pandas solamente las filas y columnas necesarias.
+
+    El filtrado y la proyección se hacen en SQL (ver ``build_query``),
+    aprovechando los índices de ``test_data``.
+
+    Parameters
+    ----------
+    db_path : str
+        Ruta a la base de datos SQLite.
+    columns, start, end, regime, time_from, time_to, table
+        Ver ``build_query``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Datos seleccionados, con ``timestamp`` convertido a fecha.
+    """
+    query, params = build_query(columns, start, end, regime,
+                                time_from, time_to, table)
+    with closing(sqlite3.connect(db_path)) as conn:
+        parse_dates = ["timestamp"] if "timestamp" in columns else None
+        return pd.read_sql_query(query, conn, params=params,
+                                 parse_dates=parse_dates)
+
+
+def load_histogram(db_path="proyecto.db", bins=100, limits=None, regime=None,
+                   table="test_data", column="data"):
+    """Calcula en SQL el histograma de una columna (por defecto, ``data``).
+
+    SQLite agrupa las muestras por intervalo y solamente devuelve un
+    conteo por intervalo, así que la memoria usada no depende del número
+    de muestras.
+
+    Parameters
+    ----------
+    db_path : str
+        Ruta a la base de datos SQLite.
+    bins : int
+        Número de intervalos de igual ancho.
+    limits : tuple of float, optional
+        Extremos ``(mínimo, máximo)`` del histograma; por defecto, el
+        mínimo y el máximo de los datos. Las muestras fuera de los
+        extremos no se cuentan.
+    regime : {"day", "night"}, optional
+        Régimen de luz solar (columna ``sunlight``).
+    table : str
+        Tabla o vista de origen.
+    column : str
+        Columna numérica de la tabla.
+
+    Returns
+    -------
+    tuple
+        Los conteos (``np.ndarray`` de ``bins`` enteros) y los ``bins +
+        1`` bordes de los intervalos.
+    """
+    import numpy as np
+
+    value = f'"{column}"'
+    where, params = f"WHERE {value} IS NOT NULL", []
+    if regime is not None:
+        where += " AND sunlight = ?"
+        params.append(REGIMES[regime])
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        if limits is None:
+            limits = conn.execute(
+                f"SELECT MIN({value}), MAX({value}) FROM {table} {where}",
+                params,
+            ).fetchone()
+        low, high = limits
+        counts = np.zeros(bins, dtype=np.int64)
+        if low is None:
+            return counts, np.linspace(0, 1, bins + 1)
+        width = (high - low) / bins or 1.0
+
+        # El máximo cae en el último intervalo, como en np.histogram
+        rows = conn.execute(
+            f"SELECT MIN(CAST(({value} - ?) / ? AS INTEGER), ?) AS bucket, "
+            f"COUNT(*) FROM {table} {where} AND {value} BETWEEN ? AND ? "
+            f"GROUP BY bucket",
+            [low, width, bins - 1, *params, low, high],
+        ).fetchall()
+    for bucket, count in rows:
+        counts[bucket] = count
+    return counts, np.linspace(low, high, bins + 1)
@@ -0,0 +1,211 @@
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+
+import numpy as np
+
+from consultas import REGIMES, load_histogram
+
+
+# Histograma y densidad estimada de una columna, listos para graficar
+Density = namedtuple(
+    "Density", ["counts", "edges", "kde_x", "kde_y", "minimum", "maximum"]
+)
+
+
+class StreamingHistogram:
+    """Histograma de intervalos fijos que se acumula por bloques.
+
+    Parameters
+    ----------
+    edges : array_like
+        Bordes de los intervalos; los valores fuera de ellos no se
+        cuentan.
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, values):
+        """Agrega un bloque de valores al histograma."""
+        counts, _ = np.histogram(values, bins=self.edges)
+        self.counts += counts
+
+
+def chunked_histogram(db_path="proyecto.db", bins=100, limits=None,
+                      regime=None, table="test_data", column="data",
+                      chunk_size=100_000):
+    """Histograma de una columna leída por bloques de ``chunk_size`` filas.
+
+    Es la alternativa a ``consultas.load_histogram`` (que agrupa en SQL)
+    cuando se necesitan los valores en Python, por ejemplo para aplicar
+    una transformación antes de contarlos. Devuelve lo mismo.
+    """
+    value = f'"{column}"'
+    where, params = f"WHERE {value} IS NOT NULL", []
+    if regime is not None:
+        where += " AND sunlight = ?"
+        params.append(REGIMES[regime])
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        if limits is None:
+            limits = conn.execute(
+                f"SELECT MIN({value}), MAX({value}) FROM {table} {where}",
+                params,
+            ).fetchone()
+        if limits[0] is None:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+        histogram = StreamingHistogram(np.linspace(*limits, bins + 1))
+        cursor = conn.execute(f"SELECT {value} FROM {table} {where}", params)
+        while rows := cursor.fetchmany(chunk_size):
+            histogram.update(np.fromiter((row[0] for row in rows),
+                                         dtype=float, count=len(rows)))
+    return histogram.counts, histogram.edges
+
+
+def binned_moments(counts, edges):
+    """Número de muestras, media y desviación estándar de un histograma.
+
+    Cada muestra se representa con el centro de su intervalo.
+    """
+    counts = np.asarray(counts, dtype=float)
+    centers = (edges[:-1] + edges[1:]) / 2
+    n = counts.sum()
+    mean = np.sum(counts * centers) / n
+    std = np.sqrt(np.sum(counts * (centers - mean) ** 2) / n)
+    return n, mean, std
+
+
+def binned_quantiles(counts, edges, qs):
+    """Cuantiles de un histograma, interpolando dentro de cada intervalo."""
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+    return np.interp(np.asarray(qs) * cumulative[-1], cumulative, edges)
+
+
+def coarsen(counts, edges, bins):
+    """Junta intervalos contiguos de un histograma para tener ``bins``.
+
+    El número de intervalos original debe ser múltiplo de ``bins``.
+    """
+    factor, remainder = divmod(len(counts), bins)
+    if remainder:
+        raise ValueError(f"{len(counts)} intervalos no se pueden agrupar "
+                         f"en {bins}")
+    return (np.asarray(counts).reshape(bins, factor).sum(axis=1),
+            np.asarray(edges)[::factor])
+
+
+def box_stats(counts, edges, whis=1.5):
+    """Estadísticas de un diagrama de caja a partir de un histograma.
+
+    Devuelve un diccionario para ``Axes.bxp``. Los bigotes llegan al
+    último intervalo con datos a menos de ``whis`` rangos intercuartílicos
+    de la caja, y cada intervalo con datos más allá se dibuja como un
+    valor atípico en su centro.
+    """
+    counts = np.asarray(counts)
+    q1, median, q3 = binned_quantiles(counts, edges, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    centers = (edges[:-1] + edges[1:]) / 2
+    occupied = counts > 0
+    inside = occupied & (edges[1:] >= q1 - whis * iqr) \
+        & (edges[:-1] <= q3 + whis * iqr)
+    low = max(edges[:-1][inside].min(), edges[0]) if inside.any() else q1
+    high = min(edges[1:][inside].max(), edges[-1]) if inside.any() else q3
+    return {"med": median, "q1": q1, "q3": q3,
+            "whislo": min(low, q1), "whishi": max(high, q3),
+            "fliers": centers[occupied & ~inside]}
+
+
+def binned_kde(counts, edges, bw_adjust=1.0, cut=3):
+    """Estimación de densidad por kernel gaussiano sobre un histograma.
+
+    Convoluciona los conteos con el kernel muestreado en los mismos
+    intervalos usando la FFT, con costo ``O(b log b)`` en el número de
+    intervalos ``b`` en lugar de ``O(n × b)`` en el número de muestras.
+    El ancho de banda es el de la regla de Scott (como ``gaussian_kde`` y
+    ``seaborn``), calculado con los momentos del histograma.
+
+    Parameters
+    ----------
+    counts : array_like
+        Conteo de cada intervalo.
+    edges : array_like
+        Bordes de los intervalos, de igual ancho.
+    bw_adjust : float
+        Factor del ancho de banda, como en ``seaborn.kdeplot``.
+    cut : float
+        Anchos de banda que la curva se extiende más allá de los datos.
+
+    Returns
+    -------
+    tuple
+        Los puntos ``x`` y la densidad en cada uno.
+    """
+    counts = np.asarray(counts, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    width = edges[1] - edges[0]
+    n, _, std = binned_moments(counts, edges)
+    bandwidth = bw_adjust * std * n ** (-1 / 5)
+    if not bandwidth > 0:
+        bandwidth = width
+
+    # Extender la malla ``cut`` anchos de banda a cada lado
+    pad = int(np.ceil(cut * bandwidth / width))
+    padded = np.pad(counts, pad)
+    x = edges[0] - pad * width + width * (np.arange(len(padded)) + 0.5)
+
+    # Kernel en una malla simétrica, y convolución lineal (no circular)
+    # con relleno de ceros hasta una longitud adecuada para la FFT
+    half = len(padded) - 1
+    offsets = width * np.arange(-half, half + 1)
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= bandwidth * np.sqrt(2 * np.pi)
+    size = 1 << int(np.ceil(np.log2(len(padded) + len(kernel) - 1)))
+    convolution = np.fft.irfft(np.fft.rfft(padded, size)
+                               * np.fft.rfft(kernel, size), size)
+    density = convolution[half:half + len(padded)] / n
+    return x, np.maximum(density, 0)
+
+
+def density_stage(db_path="proyecto.db", column="data", bins=200,
+                  regime=None, table="test_data", method="sql",
+                  chunk_size=100_000, bw_adjust=1.0):
+    """Histograma y KDE de una columna, sin cargarla completa en memoria.
+
+    Parameters
+    ----------
+    db_path : str
+        Ruta a la base de datos SQLite.
+    column : str
+        Columna numérica.
+    bins : int
+        Número de intervalos.
+    regime : {"day", "night"}, optional
+        Régimen de luz solar.
+    table : str
+        Tabla o vista de origen.
+    method : {"sql", "chunks"}
+        Agrupar en SQL (``GROUP BY``) o contar en Python por bloques.
+    chunk_size : int
+        Filas por bloque con ``method="chunks"``.
+    bw_adjust : float
+        Factor del ancho de banda del KDE.
+
+    Returns
+    -------
+    Density
+        Conteos, bordes, curva del KDE y extremos de los datos.
+    """
+    if method == "sql":
+        counts, edges = load_histogram(db_path, bins, regime=regime,
+                                       table=table, column=column)
+    elif method == "chunks":
+        counts, edges = chunked_histogram(db_path, bins, regime=regime,
+                                          table=table, column=column,
+                                          chunk_size=chunk_size)
+    else:
+        raise ValueError(f"Método desconocido: {method}")
+    kde_x, kde_y = binned_kde(counts, edges, bw_adjust)
+    return Density(counts, edges, kde_x, kde_y, edges[0], edges[-1])
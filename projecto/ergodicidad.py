@@ -0,0 +1,343 @@
+import argparse
+import sqlite3
+from contextlib import closing
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from particiones import REGIME_VIEWS, connect
+
+# Realización que guardan los scripts de ergodicidad en selected_data
+DEFAULT_MEMBER = 4
+
+# Diferencia máxima entre promedios para considerarlos similares
+DEFAULT_THRESHOLD = 0.1
+
+# Número de cada muestra dentro de su timestamp, en el orden de inserción
+MEMBERS_QUERY = """
+SELECT timestamp,
+       ROW_NUMBER() OVER (PARTITION BY timestamp ORDER BY id) - 1 AS member,
+       data
+FROM {view}
+WHERE data IS NOT NULL
+"""
+
+# Media, suma de cuadrados de las desviaciones y autocorrelación de
+# retardo 1 (Pearson sobre los pares consecutivos de cada partición), en
+# una sola consulta. Las sumas se calculan sobre los datos centrados en
+# sus medias (obtenidas antes, en ``means``): restar ``n * media**2`` de
+# la suma de cuadrados pierde precisión cuando la media es grande frente
+# a la desviación estándar
+MOMENTS_QUERY = """
+WITH pairs AS (
+    SELECT data,
+           LAG(data) OVER ({partition} ORDER BY timestamp) AS previous
+    FROM ({source})
+    WHERE data IS NOT NULL
+),
+means AS (
+    SELECT AVG(data) AS mean,
+           AVG(CASE WHEN previous IS NOT NULL THEN data END) AS mean_current,
+           AVG(previous) AS mean_previous
+    FROM pairs
+)
+SELECT COUNT(data), mean, SUM((data - mean) * (data - mean)),
+       COUNT(previous), mean_previous, mean_current,
+       SUM((previous - mean_previous) * (previous - mean_previous)),
+       SUM(CASE WHEN previous IS NOT NULL
+                THEN (data - mean_current) * (data - mean_current) END),
+       SUM((data - mean_current) * (previous - mean_previous))
+FROM pairs, means
+"""
+
+# Valores de MOMENTS_QUERY, en orden
+MOMENT_SUMS = ('n', 'mean', 'm2', 'pairs', 'mean_previous', 'mean_current',
+               'm2_previous', 'm2_current', 'products')
+
+
+def load_members(db_path="proyecto.db", regime="day"):
+    """Carga las muestras de un régimen con su número de realización.
+
+    SQLite numera las muestras de cada timestamp con ``ROW_NUMBER()``, de
+    modo que la realización ``k`` es la muestra ``k`` (desde 0) de cada
+    timestamp, como ``x.iloc[k]`` en un ``groupby('timestamp')``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas ``timestamp``, ``member`` y ``data``.
+    """
+    view, _ = REGIME_VIEWS[regime]
+    with closing(connect(db_path)) as conn:
+        return pd.read_sql_query(MEMBERS_QUERY.format(view=view), conn)
+
+
+def assign_members(df):
+    """Agrega a ``df`` la columna ``member`` con ``groupby().cumcount``.
+
+    Es el equivalente en pandas de ``load_members``, para datos que ya
+    están en memoria; las muestras de cada timestamp se numeran en el
+    orden en que aparecen.
+    """
+    df = df.dropna(subset=['data'])
+    return df.assign(member=df.groupby('timestamp').cumcount())
+
+
+def ergodicity_report(members, threshold=DEFAULT_THRESHOLD):
+    """Compara el promedio temporal de cada realización con el de ensamble.
+
+    Todos los promedios se calculan a la vez con ``np.bincount`` sobre el
+    número de realización, en una sola pasada por los datos.
+
+    Parameters
+    ----------
+    members : pd.DataFrame
+        Columnas ``member`` y ``data`` (ver ``load_members``).
+    threshold : float
+        Diferencia máxima para considerar similares los promedios.
+
+    Returns
+    -------
+    pd.DataFrame
+        Una fila por realización, con el número de muestras, el promedio
+        temporal, el promedio de ensamble (de todas las muestras), su
+        diferencia absoluta y si son similares.
+    """
+    member = members['member'].to_numpy()
+    data = members['data'].to_numpy(dtype=float)
+    counts = np.bincount(member)
+    sums = np.bincount(member, weights=data)
+    ensemble = sums.sum() / counts.sum()
+
+    present = counts > 0
+    time_average = sums[present] / counts[present]
+    difference = np.abs(time_average - ensemble)
+    return pd.DataFrame({
+        'member': np.flatnonzero(present),
+        'samples': counts[present],
+        'time_average': time_average,
+        'ensemble_average': ensemble,
+        'difference': difference,
+        'similar': difference < threshold,
+    })
+
+
+def select_member(members, k=DEFAULT_MEMBER):
+    """Muestras de la realización ``k``, ordenadas por timestamp."""
+    selected = members.loc[members['member'] == k, ['timestamp', 'data']]
+    return selected.sort_values('timestamp', kind='stable').reset_index(
+        drop=True)
+
+
+def save_ergodicity(db_path, selected, report):
+    """Guarda la realización seleccionada y el reporte, reemplazándolos.
+
+    Las tablas son ``selected_data`` (la misma de los scripts de
+    ergodicidad) y ``ergodicity_report``.
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        selected.to_sql('selected_data', conn, if_exists='replace',
+                        index=False)
+        report.to_sql('ergodicity_report', conn, if_exists='replace',
+                      index=False)
+
+
+def run(regime, db_path="proyecto.db", output_path=None,
+        member=DEFAULT_MEMBER, threshold=DEFAULT_THRESHOLD):
+    """Calcula y guarda la ergodicidad de todas las realizaciones.
+
+    Parameters
+    ----------
+    regime : {"day", "night"}
+        Régimen de luz solar.
+    db_path : str
+        Ruta a la base de datos del proyecto.
+    output_path : str, optional
+        Base de datos de resultados; por defecto, ``ergodicidad_day.db`` o
+        ``ergodicidad_night.db``.
+    member : int
+        Realización que se guarda en ``selected_data``.
+    threshold : float
+        Ver ``ergodicity_report``.
+
+    Returns
+    -------
+    tuple
+        El reporte y la ruta de la base de datos de resultados.
+    """
+    output_path = output_path or f"ergodicidad_{regime}.db"
+    members = load_members(db_path, regime)
+    report = ergodicity_report(members, threshold)
+    save_ergodicity(output_path, select_member(members, member), report)
+    return report, output_path
+
+
+def load_moments(conn, source, partition=None):
+    """Resultado de ``MOMENTS_QUERY`` sobre una consulta de ``data``.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Conexión a la base de datos.
+    source : str
+        Consulta SQL de origen.
+    partition : str, optional
+        Columna que separa las series (por ejemplo, ``member``); los pares
+        consecutivos no cruzan de una serie a otra.
+
+    Returns
+    -------
+    dict
+        Los valores de ``MOMENT_SUMS``.
+    """
+    partition = f"PARTITION BY {partition}" if partition else ""
+    row = conn.execute(MOMENTS_QUERY.format(source=source,
+                                            partition=partition)).fetchone()
+    return dict(zip(MOMENT_SUMS, (value or 0 for value in row)))
+
+
+def moments(sums):
+    """Media, varianza (``ddof=1``) y autocorrelación de retardo 1."""
+    variance = sums['m2'] / (sums['n'] - 1)
+    autocorrelation = sums['products'] / np.sqrt(sums['m2_current']
+                                                 * sums['m2_previous'])
+    return sums['mean'], variance, autocorrelation
+
+
+def effective_sizes(n, rho):
+    """Tamaños de muestra efectivos de la media y de la varianza.
+
+    Suponen un proceso AR(1) con autocorrelación de retardo 1 ``rho``: la
+    varianza de la media es la de ``n * (1 - rho) / (1 + rho)`` muestras
+    independientes y la de la varianza muestral, la de
+    ``n * (1 - rho**2) / (1 + rho**2)``. Una autocorrelación negativa se
+    toma como 0, para no obtener más muestras que ``n``.
+    """
+    rho = max(rho, 0.0)
+    return (n * (1 - rho) / (1 + rho),
+            n * (1 - rho ** 2) / (1 + rho ** 2))
+
+
+def compare_moments(ensemble, member, confidence=0.95):
+    """Compara media, varianza y autocorrelación con intervalos de confianza.
+
+    Los contrastes son la diferencia de medias, el cociente de varianzas
+    (con el intervalo de ``log``, suponiendo normalidad) y la diferencia
+    de autocorrelaciones en la escala de Fisher ``atanh(r)``. Las muestras
+    consecutivas están correlacionadas (con autocorrelación de retardo 1
+    cercana a 0.8 en los datos del proyecto), así que los intervalos de
+    la media y de la varianza usan los tamaños efectivos de
+    ``effective_sizes`` de cada lado en lugar de ``n``; con ``n`` serían
+    demasiado estrechos. Para no suponer un proceso AR(1), ver el
+    bootstrap de bloques de ``remuestreo.py``.
+
+    Parameters
+    ----------
+    ensemble, member : dict
+        Valores de ``load_moments`` de todas las muestras y de la
+        realización.
+    confidence : float
+        Nivel de confianza de los intervalos.
+
+    Returns
+    -------
+    pd.DataFrame
+        Por estadístico (``mean``, ``variance``, ``autocorrelation``): el
+        valor de ensamble y el de la realización, el contraste, su
+        intervalo, el valor del contraste sin diferencia (``null``) y si
+        el intervalo lo contiene (``consistent``).
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    mean_e, variance_e, rho_e = moments(ensemble)
+    mean_m, variance_m, rho_m = moments(member)
+    n_mean_e, n_variance_e = effective_sizes(ensemble['n'], rho_e)
+    n_mean_m, n_variance_m = effective_sizes(member['n'], rho_m)
+
+    se = np.sqrt(variance_e / n_mean_e + variance_m / n_mean_m)
+    log_ratio = np.log(variance_m / variance_e)
+    se_log = np.sqrt(2 / (n_variance_e - 1) + 2 / (n_variance_m - 1))
+    fisher = np.arctanh(rho_m) - np.arctanh(rho_e)
+    se_fisher = np.sqrt(1 / (ensemble['pairs'] - 3)
+                        + 1 / (member['pairs'] - 3))
+
+    rows = [
+        ('mean', mean_e, mean_m, mean_m - mean_e,
+         mean_m - mean_e - z * se, mean_m - mean_e + z * se, 0.0),
+        ('variance', variance_e, variance_m, np.exp(log_ratio),
+         np.exp(log_ratio - z * se_log), np.exp(log_ratio + z * se_log),
+         1.0),
+        ('autocorrelation', rho_e, rho_m, fisher,
+         fisher - z * se_fisher, fisher + z * se_fisher, 0.0),
+    ]
+    report = pd.DataFrame(rows, columns=['statistic', 'ensemble', 'member',
+                                         'contrast', 'ci_low', 'ci_high',
+                                         'null'])
+    report['consistent'] = ((report['ci_low'] <= report['null'])
+                            & (report['null'] <= report['ci_high']))
+    return report
+
+
+def compare(regime, db_path="proyecto.db", selected_path=None,
+            confidence=0.95):
+    """Compara la realización guardada con todas las muestras del régimen.
+
+    Cada lado se resume con una sola consulta de agregación en SQLite
+    (``load_moments``), así que la memoria usada no depende del tamaño de
+    las bases de datos. Los pares consecutivos del ensamble se forman
+    dentro de cada realización (ver ``MEMBERS_QUERY``).
+
+    Parameters
+    ----------
+    regime : {"day", "night"}
+        Régimen de luz solar.
+    db_path : str
+        Ruta a la base de datos del proyecto.
+    selected_path : str, optional
+        Base de datos con ``selected_data``; por defecto,
+        ``ergodicidad_day.db`` o ``ergodicidad_night.db``.
+    confidence : float
+        Ver ``compare_moments``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Ver ``compare_moments``.
+    """
+    view, _ = REGIME_VIEWS[regime]
+    selected_path = selected_path or f"ergodicidad_{regime}.db"
+    with closing(connect(db_path)) as conn:
+        ensemble = load_moments(conn, MEMBERS_QUERY.format(view=view),
+                                partition="member")
+    with closing(sqlite3.connect(selected_path)) as conn:
+        member = load_moments(conn, "SELECT timestamp, data "
+                                    "FROM selected_data")
+    return compare_moments(ensemble, member, confidence)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara el promedio temporal de cada realización con "
+                    "el promedio de ensamble de un régimen."
+    )
+    parser.add_argument("--regime", choices=list(REGIME_VIEWS),
+                        default="day")
+    parser.add_argument("--db", default="proyecto.db")
+    parser.add_argument("--member", type=int, default=DEFAULT_MEMBER,
+                        help="Realización guardada en selected_data")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="Nivel de los intervalos de confianza")
+    args = parser.parse_args()
+
+    report, path = run(args.regime, args.db, member=args.member,
+                       threshold=args.threshold)
+    print(report.to_string(index=False))
+    print(f"{report['similar'].sum()} de {len(report)} realizaciones "
+          f"similares; datos guardados en {path}")
+    print(compare(args.regime, args.db, path, args.confidence).to_string(
+        index=False))
+
+
+if __name__ == "__main__":
+    main()
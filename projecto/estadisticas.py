@@ -0,0 +1,351 @@
+import math
+from datetime import datetime
+
+from sqlalchemy import (
+    Float, Integer, cast, delete, extract, func, select, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import PackedData, RunningStats, TestData
+
+
+class RunningMoments:
+    """Momentos de una muestra, combinables sin volver a leer los datos.
+
+    Guarda el número de muestras, la media, las sumas de potencias de las
+    desviaciones respecto a la media (``m2``, ``m3``, ``m4``) y la suma
+    de cuadrados. Dos acumuladores se combinan con las fórmulas de
+    Chan y Pébay, que son numéricamente estables.
+    """
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0, sum_sq=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+        self.sum_sq = sum_sq
+
+    @classmethod
+    def from_values(cls, values):
+        """Calcula los acumuladores de un lote de muestras."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return cls()
+        mean = values.mean()
+        deviation = values - mean
+        return cls(
+            n=int(values.size),
+            mean=float(mean),
+            m2=float(np.sum(deviation**2)),
+            m3=float(np.sum(deviation**3)),
+            m4=float(np.sum(deviation**4)),
+            sum_sq=float(np.sum(values**2)),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Crea el acumulador a partir de una fila de ``running_stats``."""
+        return cls(row.n, row.mean, row.m2, row.m3, row.m4, row.sum_sq)
+
+    def merge(self, other):
+        """Devuelve la combinación de dos acumuladores."""
+        na, nb = self.n, other.n
+        n = na + nb
+        if na == 0:
+            return RunningMoments(**vars(other))
+        if nb == 0:
+            return RunningMoments(**vars(self))
+        d = other.mean - self.mean
+        return RunningMoments(
+            n=n,
+            mean=self.mean + d * nb / n,
+            m2=self.m2 + other.m2 + d**2 * na * nb / n,
+            m3=(self.m3 + other.m3
+                + d**3 * na * nb * (na - nb) / n**2
+                + 3 * d * (na * other.m2 - nb * self.m2) / n),
+            m4=(self.m4 + other.m4
+                + d**4 * na * nb * (na**2 - na * nb + nb**2) / n**3
+                + 6 * d**2 * (na**2 * other.m2 + nb**2 * self.m2) / n**2
+                + 4 * d * (na * other.m3 - nb * self.m3) / n),
+            sum_sq=self.sum_sq + other.sum_sq,
+        )
+
+    @property
+    def variance(self):
+        """Varianza muestral (``ddof=1``, como ``pandas``)."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        """Desviación estándar muestral."""
+        return math.sqrt(self.variance)
+
+    @property
+    def skewness(self):
+        """Asimetría con el mismo ajuste de sesgo que ``Series.skew``."""
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return math.nan
+        g1 = (self.m3 / n) / (self.m2 / n) ** 1.5
+        return math.sqrt(n * (n - 1)) / (n - 2) * g1
+
+    @property
+    def kurtosis(self):
+        """Curtosis en exceso, con el ajuste de ``Series.kurtosis``."""
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return math.nan
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        return (n * (n + 1) * (n - 1) * self.m4
+                / ((n - 2) * (n - 3) * self.m2**2)) - adjustment
+
+    @property
+    def power(self):
+        """Potencia promedio (media de los cuadrados)."""
+        return self.sum_sq / self.n if self.n else math.nan
+
+    def as_dict(self):
+        """Momentos con los mismos nombres que ``calculate_moments``."""
+        return {
+            "Promedio": self.mean,
+            "Varianza": self.variance,
+            "Desviación estándar": self.std,
+            "Asimetría (Skewness)": self.skewness,
+            "Curtosis": self.kurtosis,
+            "Potencia promedio": self.power,
+        }
+
+
+def time_bucket(timestamp):
+    """Hora del día de una muestra, usada como llave de los acumuladores."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp.hour
+
+
+def _merge_statement(key, batch):
+    """Construye el ``UPDATE`` que combina ``batch`` con la fila ``key``.
+
+    Toda la combinación se calcula en SQL con los valores anteriores de
+    la fila, así que es atómica aunque varios *workers* actualicen la
+    misma fila al mismo tiempo.
+    """
+    t = RunningStats
+    nb = float(batch.n)
+    na = cast(t.n, Float)
+    n = na + nb
+    d = batch.mean - t.mean
+    return (
+        update(t)
+        .where(t.group == key[0], t.sunlight == key[1], t.bucket == key[2])
+        .values(
+            n=t.n + batch.n,
+            mean=t.mean + d * nb / n,
+            m2=t.m2 + batch.m2 + d * d * na * nb / n,
+            m3=(t.m3 + batch.m3
+                + d * d * d * na * nb * (na - nb) / (n * n)
+                + 3 * d * (na * batch.m2 - nb * t.m2) / n),
+            m4=(t.m4 + batch.m4
+                + d * d * d * d * na * nb * (na * na - na * nb + nb * nb)
+                / (n * n * n)
+                + 6 * d * d * (na * na * batch.m2 + nb * nb * t.m2) / (n * n)
+                + 4 * d * (na * batch.m3 - nb * t.m3) / n),
+            sum_sq=t.sum_sq + batch.sum_sq,
+        )
+    )
+
+
+def merge_running_stats(session, key, batch):
+    """Combina un acumulador con la fila de ``running_stats`` de su llave.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        Sesión de la tarea; el ``commit`` queda a cargo de quien llama.
+    key : tuple
+        ``(group, sunlight, bucket)`` de la fila.
+    batch : RunningMoments
+        Acumulador a combinar.
+    """
+    if batch.n == 0:
+        return
+
+    # Crear la fila vacía de la llave si aún no existe
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    session.execute(
+        insert(RunningStats)
+        .values(group=key[0], sunlight=key[1], bucket=key[2], n=0,
+                mean=0.0, m2=0.0, m3=0.0, m4=0.0, sum_sq=0.0)
+        .on_conflict_do_nothing(
+            index_elements=["group", "sunlight", "bucket"]
+        )
+    )
+    session.execute(_merge_statement(key, batch))
+
+
+def update_running_stats(session, group, timestamp, sunlight, values):
+    """Combina un lote de muestras con los acumuladores de su llave.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        Sesión de la tarea; el ``commit`` queda a cargo de quien llama.
+    group : str
+        Número de grupo del proyecto.
+    timestamp : datetime or str
+        Fecha y hora de la realización.
+    sunlight : bool
+        Régimen de luz solar.
+    values : sequence of float
+        Muestras de la realización.
+    """
+    key = (group, bool(sunlight), time_bucket(timestamp))
+    merge_running_stats(session, key, RunningMoments.from_values(values))
+
+
+def read_running_stats(session, group=None, sunlight=None, bucket=None):
+    """Combina los acumuladores que cumplen los filtros dados.
+
+    El costo depende solamente del número de llaves (grupos, regímenes y
+    horas), no del número de muestras en ``test_data``.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        Sesión de la base de datos.
+    group : str, optional
+        Número de grupo; por defecto todos.
+    sunlight : bool, optional
+        Régimen de luz solar; por defecto ambos.
+    bucket : int or sequence of int, optional
+        Hora u horas del día; por defecto todas.
+
+    Returns
+    -------
+    RunningMoments
+        Acumulador combinado.
+    """
+    query = select(RunningStats)
+    if group is not None:
+        query = query.where(RunningStats.group == group)
+    if sunlight is not None:
+        query = query.where(RunningStats.sunlight == bool(sunlight))
+    if bucket is not None:
+        buckets = [bucket] if isinstance(bucket, int) else list(bucket)
+        query = query.where(RunningStats.bucket.in_(buckets))
+
+    total = RunningMoments()
+    for row in session.scalars(query):
+        total = total.merge(RunningMoments.from_row(row))
+    return total
+
+
+def _test_data_moments(session):
+    """Acumuladores de ``test_data`` por llave, agregados en SQL.
+
+    La media de cada llave se calcula en una primera agregación y las
+    sumas de potencias de las desviaciones en una segunda, como en
+    ``RunningMoments.from_values``.
+    """
+    keyed = (
+        select(TestData.group.label("group"),
+               TestData.sunlight.label("sunlight"),
+               cast(extract("hour", TestData.timestamp),
+                    Integer).label("bucket"),
+               TestData.data.label("data"))
+        .where(TestData.data.is_not(None))
+        .cte("keyed")
+    )
+    keys = (keyed.c.group, keyed.c.sunlight, keyed.c.bucket)
+    means = (
+        select(*keys, func.count().label("n"),
+               func.avg(keyed.c.data).label("mean"),
+               func.sum(keyed.c.data * keyed.c.data).label("sum_sq"))
+        .group_by(*keys)
+        .cte("means")
+    )
+    d = keyed.c.data - means.c.mean
+    query = (
+        select(*keys, means.c.n, means.c.mean, func.sum(d * d),
+               func.sum(d * d * d), func.sum(d * d * d * d), means.c.sum_sq)
+        .join(means, (keyed.c.group == means.c.group)
+              & (keyed.c.sunlight == means.c.sunlight)
+              & (keyed.c.bucket == means.c.bucket))
+        .group_by(*keys, means.c.n, means.c.mean, means.c.sum_sq)
+    )
+    for group, sunlight, bucket, *moments in session.execute(query):
+        yield (group, bool(sunlight), int(bucket)), RunningMoments(*moments)
+
+
+def _packed_data_moments(session):
+    """Acumuladores de ``packed_data`` por llave, una realización a la vez."""
+    totals = {}
+    rows = session.scalars(select(PackedData).execution_options(
+        yield_per=1000))
+    for row in rows:
+        key = (row.group, bool(row.sunlight), time_bucket(row.timestamp))
+        batch = RunningMoments.from_values(row.values)
+        totals[key] = totals.get(key, RunningMoments()).merge(batch)
+    return totals.items()
+
+
+def rebuild_running_stats(session):
+    """Reconstruye ``running_stats`` con los datos ya guardados.
+
+    Sirve para sembrar los acumuladores de una base de datos con datos
+    anteriores a ``running_stats``, o para corregirlos. Se borran las
+    filas existentes y se combinan las de ``test_data`` (agregada en SQL)
+    y las de ``packed_data``, todo en la transacción de la sesión. Los
+    *workers* deben estar detenidos mientras tanto, para no contar dos
+    veces las escrituras concurrentes.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        Sesión de la base de datos; el ``commit`` queda a cargo de quien
+        llama.
+
+    Returns
+    -------
+    int
+        Número de llaves reconstruidas.
+    """
+    session.execute(delete(RunningStats))
+    keys = set()
+    for moments in (_test_data_moments(session),
+                    _packed_data_moments(session)):
+        for key, batch in moments:
+            merge_running_stats(session, key, batch)
+            keys.add(key)
+    return len(keys)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models import session_scope
+
+    parser = argparse.ArgumentParser(
+        description="Imprime los momentos acumulados en running_stats."
+    )
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reconstruir running_stats con test_data y "
+                             "packed_data antes de imprimir")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        with session_scope() as session:
+            keys = rebuild_running_stats(session)
+        print(f"running_stats reconstruida: {keys} llaves")
+
+    with session_scope() as session:
+        for name, sunlight in [("Total", None), ("Día", True),
+                               ("Noche", False)]:
+            print(f"\n{name}:")
+            moments = read_running_stats(session, sunlight=sunlight)
+            for k, v in moments.as_dict().items():
+                print(f"{k}: {v:.4f}")
@@ -0,0 +1,310 @@
+import csv
+import io
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import PackedData, TestData
+
+
+# Columnas de la tabla test_data en el orden usado por COPY
+COLUMNS = ("group", "timestamp", "data", "sunlight")
+
+# Formato de la fecha en las respuestas de la API
+API_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def build_records(data, group):
+    """Construye las filas de ``test_data`` de una respuesta de la API.
+
+    Parameters
+    ----------
+    data : dict
+        Respuesta de la API ya decodificada (JSON).
+    group : str
+        Número de grupo del proyecto.
+
+    Returns
+    -------
+    list of dict
+        Una fila por muestra, con las llaves de ``COLUMNS``.
+    """
+    timestamp = datetime.strptime(data["timestamp"], API_TIMESTAMP_FORMAT)
+    sample_size = data["sample_size"]
+    sunlight = data["sunlight"]
+    return [
+        {
+            "group": group,
+            "timestamp": timestamp,
+            "data": value,
+            "sunlight": sunlight,
+        }
+        for value in data["data"][:sample_size]
+    ]
+
+
+def build_packed_record(data, group):
+    """Construye la fila de ``packed_data`` de una respuesta de la API.
+
+    Parameters
+    ----------
+    data : dict
+        Respuesta de la API ya decodificada (JSON).
+    group : str
+        Número de grupo del proyecto.
+
+    Returns
+    -------
+    dict
+        Una sola fila con las muestras empaquetadas en ``samples``.
+    """
+    sample_size = data["sample_size"]
+    return {
+        "group": group,
+        "timestamp": datetime.strptime(data["timestamp"],
+                                       API_TIMESTAMP_FORMAT),
+        "sunlight": data["sunlight"],
+        "sample_size": sample_size,
+        "samples": PackedData.pack(data["data"][:sample_size]),
+    }
+
+
+def stored_keys(session, model, keys):
+    """Realizaciones ``(group, timestamp)`` de ``keys`` ya guardadas.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        Sesión de la transacción en que se escribirá el lote.
+    model : type
+        ``TestData`` o ``PackedData``, según el formato de
+        almacenamiento.
+    keys : collection of tuple
+        Pares ``(group, timestamp)``, con ``timestamp`` como
+        ``datetime``.
+
+    Returns
+    -------
+    set of tuple
+        Los pares de ``keys`` que ya tienen filas en ``model``.
+    """
+    if not keys:
+        return set()
+    return set(session.execute(
+        select(model.group, model.timestamp)
+        .where(model.group.in_({group for group, _ in keys}),
+               model.timestamp.in_({timestamp for _, timestamp in keys}))
+        .distinct()
+    ).tuples()) & set(keys)
+
+
+def drop_stored(responses, session, model):
+    """Quita de un lote las respuestas que ya están guardadas.
+
+    Una realización se identifica por ``(group, timestamp)``; también se
+    quitan las repetidas dentro del lote. Con esto, escribir dos veces el
+    mismo lote (por ejemplo, uno recuperado del buffer de Redis) no
+    duplica las muestras ni los acumuladores de ``running_stats``.
+
+    Parameters
+    ----------
+    responses : list of tuple
+        Pares ``(group, data)`` con las respuestas decodificadas.
+    session : sqlalchemy.orm.Session
+        Sesión de la transacción en que se escribirá el lote.
+    model : type
+        ``TestData`` o ``PackedData``, según el formato de
+        almacenamiento.
+
+    Returns
+    -------
+    list of tuple
+        Las respuestas nuevas, en su orden original.
+    """
+    unique = {}
+    for group, data in responses:
+        timestamp = datetime.strptime(data["timestamp"], API_TIMESTAMP_FORMAT)
+        unique.setdefault((group, timestamp), (group, data))
+    stored = stored_keys(session, model, unique.keys())
+    return [response for key, response in unique.items()
+            if key not in stored]
+
+
+def write_packed(records, engine, session=None):
+    """Inserta filas de ``packed_data`` en una sola transacción.
+
+    Las realizaciones que ya están guardadas se ignoran (``ON CONFLICT DO
+    NOTHING`` sobre el índice único de ``(group, timestamp)``). Con
+    ``session``, las filas se insertan en la transacción de la sesión y
+    el ``commit`` queda a cargo de quien llama.
+    """
+    if not records:
+        return
+    dialect = engine.dialect.name
+    insert_ignore = (
+        (postgresql.insert if dialect == "postgresql" else sqlite.insert)
+        (PackedData)
+        .on_conflict_do_nothing(index_elements=["group", "timestamp"])
+    )
+    if session is not None:
+        session.execute(insert_ignore, records)
+        return
+    with engine.begin() as connection:
+        connection.execute(insert_ignore, records)
+
+
+def insert_per_row(records, session):
+    """Inserta las filas una por una, con un ``commit`` por muestra.
+
+    Es el comportamiento original de ``test_task`` y se mantiene
+    solamente como referencia para comparar el rendimiento.
+    """
+    for record in records:
+        session.add(TestData(**record))
+        session.commit()
+
+
+def _copy_postgresql(records, connection):
+    """Carga las filas con ``COPY ... FROM STDIN`` en PostgreSQL.
+
+    Utiliza la conexión de DBAPI de ``connection``, dentro de su
+    transacción (sin ``commit``).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([record[column] for column in COLUMNS])
+    buffer.seek(0)
+
+    columns = ", ".join(f'"{column}"' for column in COLUMNS)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {TestData.__tablename__} ({columns}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def _insert_all(records, connection):
+    if connection.dialect.name == "postgresql":
+        _copy_postgresql(records, connection)
+    else:
+        connection.execute(insert(TestData), records)
+
+
+def bulk_insert(records, engine, session=None):
+    """Inserta todas las filas en una sola transacción.
+
+    En PostgreSQL utiliza ``COPY``; en los demás motores (SQLite) utiliza
+    un ``INSERT`` con ``executemany``.
+
+    Parameters
+    ----------
+    records : list of dict
+        Filas construidas con ``build_records``.
+    engine : sqlalchemy.engine.Engine
+        Motor de la base de datos de destino.
+    session : sqlalchemy.orm.Session, optional
+        Si se da, las filas se escriben en la transacción de la sesión y
+        el ``commit`` queda a cargo de quien llama.
+    """
+    if not records:
+        return
+    if session is not None:
+        _insert_all(records, session.connection())
+        return
+    with engine.begin() as connection:
+        _insert_all(records, connection)
+
+
+def write_records(records, engine, session=None, mode="bulk"):
+    """Escribe las filas y reporta el rendimiento en filas por segundo.
+
+    Parameters
+    ----------
+    records : list of dict
+        Filas construidas con ``build_records``.
+    engine : sqlalchemy.engine.Engine
+        Motor de la base de datos de destino.
+    session : sqlalchemy.orm.Session, optional
+        Sesión utilizada en el modo ``"row"``; en el modo ``"bulk"``, las
+        filas se escriben en su transacción (ver ``bulk_insert``).
+    mode : {"bulk", "row"}
+        ``"bulk"`` escribe todo en una transacción; ``"row"`` conserva el
+        ``commit`` por muestra original.
+
+    Returns
+    -------
+    float
+        Filas escritas por segundo.
+    """
+    start = time.perf_counter()
+    if mode == "row":
+        insert_per_row(records, session)
+    elif mode == "bulk":
+        bulk_insert(records, engine, session)
+    else:
+        raise ValueError(f"Modo de escritura desconocido: {mode}")
+    elapsed = time.perf_counter() - start
+
+    rate = len(records) / elapsed if elapsed > 0 else float("inf")
+    logging.info(
+        f"Escritura '{mode}': {len(records)} filas en {elapsed:.4f} s "
+        f"({rate:.0f} filas/s)"
+    )
+    return rate
+
+
+def benchmark(n_responses=20, sample_size=100, path="benchmark_ingesta.db"):
+    """Compara la escritura por fila contra la escritura en lote.
+
+    Crea una base de datos SQLite temporal en ``path``, escribe
+    ``n_responses`` respuestas sintéticas con cada modo e imprime las
+    filas por segundo obtenidas.
+    """
+    import os
+    import random
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from models import Base
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    responses = [
+        {
+            "timestamp": "2024-11-13 12:00:00",
+            "sample_size": sample_size,
+            "sunlight": True,
+            "data": [random.gauss(0, 1) for _ in range(sample_size)],
+        }
+        for _ in range(n_responses)
+    ]
+
+    try:
+        for mode in ("row", "bulk"):
+            total = 0
+            start = time.perf_counter()
+            for response in responses:
+                records = build_records(response, "000")
+                write_records(records, engine,
+                              session if mode == "row" else None, mode=mode)
+                total += len(records)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:>4}: {total} filas, {total / elapsed:.0f} filas/s")
+    finally:
+        session.close()
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,161 @@
+import argparse
+import sqlite3
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from models import Base, PackedData, SAMPLE_DTYPE
+
+
+# Valor del byte ``j`` (0 a 7) de una muestra, a partir de su texto
+# hexadecimal ``h``
+_BYTE = ("((instr('0123456789ABCDEF', substr(h, {0}, 1)) - 1) * 16"
+         " + instr('0123456789ABCDEF', substr(h, {1}, 1)) - 1)")
+
+
+def _byte(j):
+    return _BYTE.format(2 * j + 1, 2 * j + 2)
+
+
+# Vista que expone packed_data con la forma de test_data (una fila por
+# muestra). Cada muestra (float64 little-endian, IEEE 754) se decodifica
+# en SQL puro: signo, exponente y mantisa se arman con los bytes, y el
+# valor es exacto. Solo usa funciones incluidas en SQLite (``power``
+# desde la versión 3.35), así que la vista se puede leer con cualquier
+# conexión de sqlite3 o de pandas, sin registrar funciones propias.
+VIEW_SQL = """
+CREATE VIEW IF NOT EXISTS {{name}} AS
+WITH RECURSIVE sample_index(k) AS (
+    SELECT 0
+    UNION ALL
+    SELECT k + 1 FROM sample_index
+    WHERE k + 1 < (SELECT MAX(sample_size) FROM packed_data)
+)
+SELECT packed_id, sample, "group", timestamp,
+       CASE
+           WHEN exponent = 2047 THEN NULL
+           WHEN exponent = 0 THEN mantissa * power(2, -1074)
+           ELSE (mantissa + 4503599627370496) * power(2, exponent - 1075)
+       END * (1 - 2 * sign) AS data,
+       sunlight
+FROM (
+    SELECT packed_id, sample, "group", timestamp, sunlight,
+           {b7} >> 7 AS sign,
+           (({b7} & 127) << 4) | ({b6} >> 4) AS exponent,
+           (({b6} & 15) << 48) | ({b5} << 40) | ({b4} << 32)
+           | ({b3} << 24) | ({b2} << 16) | ({b1} << 8) | {b0} AS mantissa
+    FROM (
+        SELECT p.id AS packed_id,
+               sample_index.k AS sample,
+               p."group" AS "group",
+               p.timestamp AS timestamp,
+               p.sunlight AS sunlight,
+               hex(substr(p.samples, 8 * sample_index.k + 1, 8)) AS h
+        FROM packed_data AS p
+        JOIN sample_index ON sample_index.k < p.sample_size
+    )
+)
+""".format(**{f"b{j}": _byte(j) for j in range(8)})
+
+# Índice único de las realizaciones (ver models.PackedData), con el que
+# se buscan las ya migradas
+INDEX_SQL = ('CREATE UNIQUE INDEX IF NOT EXISTS '
+             'ix_packed_data_group_timestamp '
+             'ON packed_data ("group", timestamp)')
+
+
+def migrate(conn, chunk_size=100_000):
+    """Empaqueta las filas de test_data en packed_data.
+
+    La tabla packed_data debe existir. Las muestras se agrupan por
+    ``(group, timestamp, sunlight)`` en el orden de ``id``. La tabla se
+    lee por bloques, así que la memoria utilizada no depende del tamaño
+    de test_data. Solamente se migran las realizaciones que aún no están
+    en packed_data; para buscarlas se crea el índice de ``(group,
+    timestamp)`` de packed_data, si no existe.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Conexión a la base de datos del proyecto.
+    chunk_size : int
+        Número de filas de test_data leídas por bloque.
+
+    Returns
+    -------
+    int
+        Número de realizaciones migradas.
+    """
+    conn.execute(INDEX_SQL)
+    cursor = conn.execute(
+        'SELECT t."group", t.timestamp, t.sunlight, t.data '
+        "FROM test_data AS t "
+        "WHERE NOT EXISTS (SELECT 1 FROM packed_data AS p "
+        'WHERE p."group" IS t."group" AND p.timestamp IS t.timestamp) '
+        'ORDER BY t."group", t.timestamp, t.id'
+    )
+
+    migrated = 0
+    key, values = None, []
+
+    def flush():
+        group, timestamp, sunlight = key
+        samples = np.asarray(values, dtype=SAMPLE_DTYPE)
+        conn.execute(
+            'INSERT INTO packed_data ("group", timestamp, sunlight, '
+            "sample_size, samples) VALUES (?, ?, ?, ?, ?)",
+            (group, timestamp, sunlight, len(samples), samples.tobytes()),
+        )
+
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for group, timestamp, sunlight, value in rows:
+            if (group, timestamp, sunlight) != key:
+                if key is not None:
+                    flush()
+                    migrated += 1
+                key, values = (group, timestamp, sunlight), []
+            values.append(value)
+    if key is not None:
+        flush()
+        migrated += 1
+
+    conn.commit()
+    return migrated
+
+
+def create_compatibility_view(conn, name="test_data_view"):
+    """Crea la vista que desempaqueta packed_data en filas por muestra."""
+    conn.execute(VIEW_SQL.format(name=name))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migra test_data al almacenamiento empaquetado."
+    )
+    parser.add_argument("--db", default="proyecto.db",
+                        help="Base de datos SQLite del proyecto")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--view", default="test_data_view",
+                        help="Nombre de la vista de compatibilidad")
+    args = parser.parse_args()
+
+    # Crear la tabla packed_data si no existe
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine, tables=[PackedData.__table__])
+    engine.dispose()
+
+    conn = sqlite3.connect(args.db)
+    migrated = migrate(conn, args.chunk_size)
+    create_compatibility_view(conn, args.view)
+    conn.close()
+
+    print(f"{migrated} realizaciones migradas a packed_data en {args.db}; "
+          f"vista de compatibilidad: {args.view}")
+
+
+if __name__ == "__main__":
+    main()
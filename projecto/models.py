@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Index, LargeBinary, UniqueConstraint, text
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
 import configparser
+import os
 
 
 # Crear la clase base de la tabla
@@ -8,14 +13,26 @@ class Base(DeclarativeBase):
     pass
 
 
-# Datos de configuración
-config = configparser.ConfigParser()
-config.read("proyecto.cfg")
-db = config["db"]["db"]
-if db == "sqlite":
-    system = config["db"]["sqlite"]
-elif db == "postgresql":
-    system = config["db"]["postgresql"]
+# Datos de configuración (se leen al crear el engine, no al importar)
+CONFIG_PATH = "proyecto.cfg"
+
+
+def read_config(path=CONFIG_PATH):
+    """Lee ``proyecto.cfg`` y devuelve la URL de la base de datos.
+
+    Returns
+    -------
+    tuple
+        El ``ConfigParser`` y la URL de conexión (``system``).
+    """
+    config = configparser.ConfigParser()
+    config.read(path)
+    db = config["db"]["db"]
+    if db == "sqlite":
+        system = config["db"]["sqlite"]
+    elif db == "postgresql":
+        system = config["db"]["postgresql"]
+    return config, system
 
 
 # Definir los modelos
@@ -28,10 +45,209 @@ class TestData(Base):
     data = Column(Integer)
     sunlight = Column(Boolean)  # Agregar la columna sunlight
 
-# Crear la conexión a la base de datos SQLite3 o PostgreSQL
-engine = create_engine(system)
-Session = sessionmaker(bind=engine)
-session = Session()
+    # Índices para filtrar por régimen o por grupo en un rango de tiempo
+    __table_args__ = (
+        Index("ix_test_data_sunlight_timestamp", "sunlight", "timestamp"),
+        Index("ix_test_data_group_timestamp", "group", "timestamp"),
+    )
+
+
+# Formato de las muestras empaquetadas: float64 little-endian
+SAMPLE_DTYPE = "<f8"
+
+
+class PackedData(Base):
+    """Una fila por realización (respuesta de la API), con las muestras
+    empaquetadas como un arreglo binario de ``float64``."""
+
+    __tablename__ = "packed_data"
+
+    id = Column(Integer, primary_key=True)
+    group = Column(String)
+    timestamp = Column(DateTime)
+    sunlight = Column(Boolean)
+    sample_size = Column(Integer)
+    samples = Column(LargeBinary)
+
+    # Una sola fila por realización: las escrituras repetidas se ignoran
+    # (ver ingesta.py) y la migración busca aquí las ya migradas
+    __table_args__ = (
+        Index("ix_packed_data_group_timestamp", "group", "timestamp",
+              unique=True),
+    )
+
+    @staticmethod
+    def pack(values):
+        """Convierte una secuencia de muestras en bytes."""
+        import numpy as np
+        return np.asarray(values, dtype=SAMPLE_DTYPE).tobytes()
+
+    @property
+    def values(self):
+        """Vista de NumPy (sin copia, solo lectura) de las muestras."""
+        import numpy as np
+        return np.frombuffer(self.samples, dtype=SAMPLE_DTYPE)
+
+
+class RunningStats(Base):
+    """Acumuladores de momentos centrales, actualizados en cada escritura.
+
+    Hay una fila por grupo, régimen de luz solar y hora del día
+    (``bucket``). Las filas se combinan entre sí para obtener los
+    momentos de cualquier agregado (ver ``estadisticas.py``).
+    """
+
+    __tablename__ = "running_stats"
+
+    id = Column(Integer, primary_key=True)
+    group = Column(String)
+    sunlight = Column(Boolean)
+    bucket = Column(Integer)  # Hora del día (0 a 23)
+    n = Column(Integer, default=0)
+    mean = Column(Float, default=0.0)
+    m2 = Column(Float, default=0.0)  # Suma de (x - media)**2
+    m3 = Column(Float, default=0.0)
+    m4 = Column(Float, default=0.0)
+    sum_sq = Column(Float, default=0.0)  # Suma de x**2 (potencia)
+
+    __table_args__ = (
+        UniqueConstraint("group", "sunlight", "bucket",
+                         name="uq_running_stats_key"),
+    )
+
+
+def engine_options(section, system):
+    """Lee las opciones del pool de conexiones de la configuración.
+
+    ``pool_size`` y ``max_overflow`` solamente se usan si el dialecto
+    elige un ``QueuePool`` para ``system``; otros pools (por ejemplo, el
+    de una base de datos SQLite en memoria) no los aceptan.
+
+    Parameters
+    ----------
+    section : configparser.SectionProxy
+        Sección ``[db]`` de ``proyecto.cfg``.
+    system : str
+        URL de conexión.
+
+    Returns
+    -------
+    dict
+        Argumentos para ``create_engine``.
+    """
+    options = {
+        "pool_pre_ping": section.getboolean("pool_pre_ping", True),
+        "pool_recycle": section.getint("pool_recycle", 1800),
+    }
+    url = make_url(system)
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options["pool_size"] = section.getint("pool_size", 5)
+        options["max_overflow"] = section.getint("max_overflow", 10)
+    return options
+
+
+# Engine y sesiones del proceso, creados la primera vez que se usan
+_engine = None
+_Session = None
+_session = None
+
+
+def get_engine():
+    """Devuelve el engine del proceso, creándolo la primera vez.
+
+    Al crearlo lee ``proyecto.cfg``, configura el pool de conexiones y
+    crea las tablas e índices que falten. Importar ``models`` no tiene
+    ninguno de estos costos.
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+        Engine de la base de datos SQLite3 o PostgreSQL.
+    """
+    global _engine, _Session
+    if _engine is None:
+        config, system = read_config()
+        engine = create_engine(system,
+                               **engine_options(config["db"], system))
+
+        # Crear la(s) tabla(s) en la base de datos
+        Base.metadata.create_all(engine)
+
+        # Crear los índices nuevos también en tablas creadas antes
+        for table in (TestData.__table__, PackedData.__table__):
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+
+        # Crear las vistas de los regímenes (particiones virtuales)
+        from particiones import view_statements
+        with engine.begin() as connection:
+            for statement in view_statements(engine.dialect.name):
+                connection.execute(text(statement))
+
+        _engine = engine
+        _Session = sessionmaker(bind=engine)
+    return _engine
+
+
+def get_sessionmaker():
+    """Devuelve la fábrica de sesiones ligada al engine del proceso."""
+    get_engine()
+    return _Session
+
+
+def dispose_engine():
+    """Descarta las conexiones heredadas del proceso padre.
+
+    Se ejecuta en el proceso hijo después de cada ``fork`` (por ejemplo,
+    en los *workers* de Celery): las conexiones del padre no se cierran
+    (siguen siendo suyas), solamente se sacan del pool del hijo, que abre
+    conexiones nuevas cuando las necesita.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=dispose_engine)
+
+
+@contextmanager
+def session_scope():
+    """Sesión propia de una tarea, con ``commit`` o ``rollback`` al final.
+
+    Cada tarea de Celery debe usar su propia sesión en lugar de compartir
+    ``session`` con las demás tareas del proceso.
+
+    Yields
+    ------
+    sqlalchemy.orm.Session
+        Sesión nueva, cerrada al salir del bloque ``with``.
+    """
+    task_session = get_sessionmaker()()
+    try:
+        yield task_session
+        task_session.commit()
+    except Exception:
+        task_session.rollback()
+        raise
+    finally:
+        task_session.close()
+
+
+def __getattr__(name):
+    """Compatibilidad con ``from models import engine, Session, session``.
 
-# Crear la(s) tabla(s) en la base de datos
-Base.metadata.create_all(engine)
+    Estos nombres se crean solamente cuando se piden por primera vez.
+    """
+    global _session
+    if name == "engine":
+        return get_engine()
+    if name == "Session":
+        return get_sessionmaker()
+    if name == "session":
+        if _session is None:
+            _session = get_sessionmaker()()
+        return _session
+    if name in ("config", "system"):
+        config, system = read_config()
+        return config if name == "config" else system
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
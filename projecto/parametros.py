@@ -0,0 +1,165 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from consultas import TIMESTAMP_FORMAT
+from logistica import fit_groups
+from particiones import REGIME_VIEWS, connect
+
+
+# Tabla de parámetros con un índice único en timestamp, que permite
+# actualizarla con INSERT ... ON CONFLICT en lugar de reemplazarla
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS parameters (
+    timestamp TEXT,
+    loc REAL,
+    scale REAL
+)
+"""
+CREATE_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS ix_parameters_timestamp
+ON parameters (timestamp)
+"""
+UPSERT = """
+INSERT INTO parameters (timestamp, loc, scale) VALUES (?, ?, ?)
+ON CONFLICT (timestamp) DO UPDATE SET
+    loc = excluded.loc,
+    scale = excluded.scale
+"""
+
+
+# Último id de test_data considerado por update_parameters, por vista
+CREATE_STATE = """
+CREATE TABLE IF NOT EXISTS ingest_state (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER
+)
+"""
+SAVE_STATE = """
+INSERT INTO ingest_state (source, last_id) VALUES (?, ?)
+ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id
+"""
+
+
+def create_parameters_table(conn):
+    """Crea la tabla ``parameters`` y su índice si aún no existen.
+
+    Las tablas creadas antes con ``to_sql`` conservan sus filas; solamente
+    se les agrega el índice. También crea ``ingest_state``.
+    """
+    conn.execute(CREATE_TABLE)
+    conn.execute(CREATE_INDEX)
+    conn.execute(CREATE_STATE)
+
+
+def last_ingested_id(conn, source):
+    """Último id de ``source`` ya considerado en ``parameters``, o ``None``."""
+    row = conn.execute("SELECT last_id FROM ingest_state WHERE source = ?",
+                       (source,)).fetchone()
+    return row[0] if row else None
+
+
+def save_parameters(conn, parameters, source=None, last_id=None,
+                    full=False):
+    """Inserta o actualiza filas de ``parameters`` por timestamp.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Conexión a la base de datos de parámetros.
+    parameters : pd.DataFrame
+        Columnas ``timestamp``, ``loc`` y ``scale``. Las fechas se guardan
+        con el mismo formato de ``test_data``.
+    source : str, optional
+        Vista de la que salen los parámetros (ver ``REGIME_VIEWS``). Si se
+        da, ``last_id`` se guarda en ``ingest_state`` en la misma
+        transacción que los parámetros.
+    last_id : int, optional
+        Mayor ``id`` de ``source`` considerado en ``parameters``.
+    full : bool
+        Si es ``True``, ``parameters`` contiene todos los timestamps y
+        reemplaza las filas anteriores de la tabla.
+    """
+    create_parameters_table(conn)
+    timestamps = parameters["timestamp"]
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = timestamps.dt.strftime(TIMESTAMP_FORMAT)
+    rows = zip(timestamps, parameters["loc"].astype(float),
+               parameters["scale"].astype(float))
+    with conn:
+        if full:
+            conn.execute("DELETE FROM parameters")
+        conn.executemany(UPSERT, rows)
+        if source is not None:
+            conn.execute(SAVE_STATE, (source, last_id))
+
+
+def update_parameters(regime, db_path="proyecto.db", parameters_path=None,
+                      full=False):
+    """Ajusta y guarda los parámetros de los timestamps con filas nuevas.
+
+    La tabla ``ingest_state`` guarda el mayor ``id`` de ``test_data`` ya
+    considerado. Solamente se vuelven a ajustar los timestamps que
+    recibieron filas con un ``id`` mayor, con todas sus muestras, de modo
+    que el costo depende de los datos nuevos y no del tamaño de
+    ``test_data``; también se actualizan los timestamps que ya estaban en
+    ``parameters`` si les llegan muestras tarde (por ejemplo, de otro
+    grupo). Sin ``ingest_state`` se ajustan todos los timestamps.
+
+    Parameters
+    ----------
+    regime : {"day", "night"}
+        Régimen de luz solar.
+    db_path : str
+        Ruta a la base de datos del proyecto.
+    parameters_path : str, optional
+        Base de datos de parámetros; por defecto, ``parameters_day.db`` o
+        ``parameters_night.db``.
+    full : bool
+        Si es ``True``, vuelve a ajustar todos los timestamps y reemplaza
+        la tabla ``parameters``.
+
+    Returns
+    -------
+    tuple
+        Número de timestamps ajustados y ruta de la base de datos de
+        parámetros.
+    """
+    view, _ = REGIME_VIEWS[regime]
+    parameters_path = parameters_path or f"parameters_{regime}.db"
+
+    with closing(sqlite3.connect(parameters_path)) as target:
+        create_parameters_table(target)
+        last_id = None if full else last_ingested_id(target, view)
+
+        with closing(connect(db_path)) as conn:
+            # Las filas que lleguen durante la lectura quedan para la
+            # siguiente actualización
+            newest = conn.execute(f"SELECT MAX(id) FROM {view}").fetchone()[0]
+            if newest is None or newest == last_id:
+                return 0, parameters_path
+            if last_id is not None and newest < last_id:
+                # test_data se volvió a crear: ajustar todo de nuevo
+                last_id = None
+            query = f"SELECT timestamp, data FROM {view} WHERE id <= ?"
+            params = [newest]
+            if last_id is not None:
+                query += (f" AND timestamp IN (SELECT timestamp FROM {view}"
+                          f" WHERE id > ? AND id <= ?)")
+                params += [last_id, newest]
+            data_df = pd.read_sql_query(query, conn, params=params)
+
+        # Verificar que la columna "data" no contenga valores nulos
+        if data_df["data"].isnull().any():
+            raise ValueError("La columna 'data' contiene valores nulos. "
+                             "Elimina o imputa los datos antes de continuar.")
+        if data_df.empty:
+            return 0, parameters_path
+
+        parameters = fit_groups(data_df, by="timestamp", column="data")
+        # Sin last_id se ajustaron todos los timestamps: se quitan los que
+        # ya no están en test_data
+        save_parameters(target, parameters, view, newest,
+                        full=last_id is None)
+    return len(parameters), parameters_path
@@ -0,0 +1,56 @@
+import sqlite3
+
+
+# Particiones virtuales de test_data por régimen de luz solar: vistas que
+# filtran en la columna sunlight y aprovechan el índice (sunlight,
+# timestamp), sin copiar los datos a otras bases de datos
+REGIME_VIEWS = {
+    "day": ("test_data_day", "TRUE"),
+    "night": ("test_data_night", "FALSE"),
+}
+
+
+def view_statements(dialect="sqlite"):
+    """Devuelve las instrucciones SQL que crean las vistas de los regímenes.
+
+    Parameters
+    ----------
+    dialect : {"sqlite", "postgresql"}
+        Motor de la base de datos.
+
+    Returns
+    -------
+    list of str
+        Una instrucción ``CREATE VIEW`` por régimen.
+    """
+    create = ("CREATE OR REPLACE VIEW" if dialect == "postgresql"
+              else "CREATE VIEW IF NOT EXISTS")
+    return [
+        f"{create} {name} AS SELECT * FROM test_data WHERE sunlight = {value}"
+        for name, value in REGIME_VIEWS.values()
+    ]
+
+
+def create_regime_views(conn):
+    """Crea las vistas de los regímenes en una conexión de sqlite3."""
+    for statement in view_statements():
+        conn.execute(statement)
+    conn.commit()
+
+
+def connect(db_path="proyecto.db"):
+    """Abre la base de datos del proyecto con las vistas de los regímenes.
+
+    Parameters
+    ----------
+    db_path : str
+        Ruta a la base de datos SQLite.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Conexión donde ``test_data_day`` y ``test_data_night`` existen.
+    """
+    conn = sqlite3.connect(db_path)
+    create_regime_views(conn)
+    return conn
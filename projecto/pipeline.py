@@ -0,0 +1,289 @@
+import argparse
+import logging
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+import analisis
+from autocorrelacion import DEFAULT_MEMBER, acf_table, save_acf
+from consultas import REGIMES, load_samples
+from ergodicidad import (assign_members, ergodicity_report, save_ergodicity,
+                         select_member)
+from parametros import save_parameters
+from particiones import REGIME_VIEWS
+from seleccion_modelos import select_model
+
+
+@dataclass
+class Step:
+    """Etapa registrada del pipeline."""
+
+    name: str
+    function: Callable
+    inputs: tuple
+    outputs: tuple
+
+
+# Registro de etapas, por nombre
+STEPS = {}
+
+
+def step(name, inputs=(), outputs=()):
+    """Registra una etapa con sus entradas y salidas declaradas.
+
+    La función recibe los valores de ``inputs`` como argumentos
+    posicionales y devuelve un valor por cada nombre de ``outputs`` (una
+    tupla si hay más de uno).
+    """
+    def decorator(function):
+        STEPS[name] = Step(name, function, tuple(inputs), tuple(outputs))
+        return function
+    return decorator
+
+
+def resolve(targets=None):
+    """Devuelve las etapas necesarias para producir ``targets``.
+
+    Parameters
+    ----------
+    targets : list of str, optional
+        Nombres de etapas a ejecutar; por defecto, todas.
+
+    Returns
+    -------
+    dict
+        Etapas a ejecutar (incluyendo sus dependencias), por nombre.
+    """
+    producers = {
+        output: s for s in STEPS.values() for output in s.outputs
+    }
+    pending = list(STEPS if targets is None else targets)
+    selected = {}
+    while pending:
+        name = pending.pop()
+        if name in selected:
+            continue
+        if name not in STEPS:
+            raise KeyError(f"Etapa desconocida: {name}")
+        selected[name] = STEPS[name]
+        for required in STEPS[name].inputs:
+            if required not in producers:
+                raise KeyError(f"Ninguna etapa produce '{required}'")
+            pending.append(producers[required].name)
+    return selected
+
+
+def run(targets=None, workers=4):
+    """Ejecuta las etapas, en paralelo cuando no dependen entre sí.
+
+    Todas las etapas comparten en memoria los resultados de las demás
+    (por ejemplo, los datos se cargan y se convierten una sola vez). Se
+    usan hilos para no copiar los ``DataFrame`` entre procesos.
+
+    Parameters
+    ----------
+    targets : list of str, optional
+        Nombres de etapas a ejecutar; por defecto, todas.
+    workers : int
+        Número máximo de etapas ejecutándose al mismo tiempo.
+
+    Returns
+    -------
+    dict
+        Todas las salidas producidas, por nombre.
+    """
+    pending = resolve(targets)
+    results, running = {}, {}
+
+    def start(s):
+        begin = time.perf_counter()
+        values = s.function(*(results[name] for name in s.inputs))
+        return values, time.perf_counter() - begin
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            ready = [s for s in pending.values()
+                     if all(name in results for name in s.inputs)]
+            for s in ready:
+                del pending[s.name]
+                running[executor.submit(start, s)] = s
+            if not running:
+                raise RuntimeError("Dependencias circulares en el pipeline")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                s = running.pop(future)
+                values, elapsed = future.result()
+                if len(s.outputs) == 1:
+                    values = (values,)
+                results.update(zip(s.outputs, values))
+                logging.info(f"Etapa '{s.name}' terminada en {elapsed:.2f} s")
+    return results
+
+
+def save_table(df, db_path, table):
+    """Guarda un ``DataFrame`` en una tabla SQLite, reemplazándola."""
+    with sqlite3.connect(db_path) as conn:
+        df.to_sql(table, conn, if_exists='replace', index=False)
+
+
+# ----------
+# Etapas
+# ----------
+
+DB_PATH = 'proyecto.db'
+OUTPUT_DIR = Path(__file__).parent
+
+
+@step('load', outputs=['samples'])
+def load():
+    """Carga test_data una sola vez, con los timestamps ya convertidos."""
+    return load_samples(DB_PATH,
+                        columns=('id', 'timestamp', 'data', 'sunlight'))
+
+
+@step('split', inputs=['samples'],
+      outputs=[f'samples_{regime}' for regime in REGIMES])
+def split(samples):
+    """Separa los datos por régimen de luz solar, en memoria."""
+    return tuple(
+        samples.loc[samples['sunlight'] == value, ['id', 'timestamp', 'data']]
+        .reset_index(drop=True)
+        for value in REGIMES.values()
+    )
+
+
+def parametros(regime, samples):
+    """Parámetros ``loc`` y ``scale`` de cada timestamp.
+
+    Se ajustan todos los timestamps, así que la tabla ``parameters`` se
+    reemplaza y ``ingest_state`` queda en el mayor ``id`` cargado, como
+    con ``update_parameters(regime, full=True)``.
+    """
+    parameters = analisis.fit_logistic_parameters(samples)
+    view, _ = REGIME_VIEWS[regime]
+    last_id = int(samples['id'].max()) if len(samples) else None
+    with closing(sqlite3.connect(f'parameters_{regime}.db')) as conn:
+        save_parameters(conn, parameters, view, last_id, full=True)
+    return parameters
+
+
+def ergodicidad(regime, samples):
+    """Quinta realización y ergodicidad de todas las realizaciones."""
+    members = assign_members(samples)
+    selected = select_member(members)
+    save_ergodicity(f'ergodicidad_{regime}.db', selected,
+                    ergodicity_report(members))
+    return selected
+
+
+def estacionalidad(regime, samples):
+    """Promedios cada 10 minutos y su autocorrelación móvil."""
+    sampled = analisis.resample_mean(samples)
+    window, lags = analisis.autocorrelation_options()
+    sampled = sampled.join(analisis.rolling_autocorrelations(
+        sampled['data'], window, lags
+    ))
+    db_path = f'estacionalidad_{regime}.db'
+    save_table(sampled[['timestamp', 'data']], db_path, 'sampled_data')
+    save_table(sampled.dropna(subset=['data', 'autocorrelation']), db_path,
+               'filtered_sampled_data_with_autocorrelation')
+    return sampled
+
+
+def acf(regime, samples):
+    """Función de autocorrelación del régimen y de cada día, con la FFT."""
+    series = select_member(assign_members(samples), DEFAULT_MEMBER)
+    table = acf_table(series, regime)
+    save_acf(table, f'estacionalidad_{regime}.db')
+    return table
+
+
+def distribucion(regime, samples):
+    """Mejor distribución candidata para todas las muestras del régimen.
+
+    Como los scripts de distribución, ajusta con ``select_model`` y
+    guarda la gráfica ``grafica_mejordistribucion_<régimen>.png``.
+    """
+    selection = select_model(samples['data'].dropna(), analisis.DISTRIBUTIONS)
+    suffix = analisis.SUFFIXES[regime]
+    selection.plot(OUTPUT_DIR / f'grafica_mejordistribucion_{suffix}.png',
+                   dpi=300)
+    return {'best': selection.get_best(), 'summary': selection.summary()}
+
+
+def loc_scale(regime, parameters):
+    """Tendencias cuadráticas de ``loc`` y ``scale`` y sus gráficas."""
+    from matplotlib.figure import Figure
+
+    minutes, filtered, coefficients = analisis.fit_quadratic_trends(
+        parameters, regime
+    )
+    x_values = np.linspace(minutes.min(), minutes.max(), 1000)
+    for column, color in (('loc', 'blue'), ('scale', 'green')):
+        c = coefficients[column]
+        # Figure (sin pyplot) para poder graficar desde varios hilos
+        figure = Figure(figsize=(12, 6))
+        axes = figure.subplots()
+        axes.scatter(minutes, filtered[column], c=color, alpha=0.7,
+                     label=f'Datos ({column})')
+        axes.plot(x_values, np.polyval(c, x_values), 'r-',
+                  label=(f"Ajuste polinómico ({column}): "
+                         f"$y = {c[0]:.8f}x^2 + {c[1]:.8f}x + {c[2]:.8f}$"))
+        axes.set_xlabel('Minutos desde la medianoche')
+        axes.set_ylabel(f'Valores de {column}')
+        axes.legend()
+        axes.grid(True)
+        suffix = analisis.SUFFIXES[regime]
+        figure.savefig(OUTPUT_DIR / f'grafica_{column}_{suffix}.png')
+    return coefficients
+
+
+# Registrar las etapas de cada régimen
+for regime in REGIMES:
+    source = f'samples_{regime}'
+    step(f'parametros_{regime}', [source], [f'parameters_{regime}'])(
+        partial(parametros, regime))
+    step(f'ergodicidad_{regime}', [source], [f'selected_{regime}'])(
+        partial(ergodicidad, regime))
+    step(f'estacionalidad_{regime}', [source], [f'sampled_{regime}'])(
+        partial(estacionalidad, regime))
+    step(f'acf_{regime}', [source], [f'acf_{regime}'])(
+        partial(acf, regime))
+    step(f'distribucion_{regime}', [source], [f'distribution_{regime}'])(
+        partial(distribucion, regime))
+    step(f'loc_scale_{regime}', [f'parameters_{regime}'],
+         [f'trends_{regime}'])(partial(loc_scale, regime))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ejecuta las etapas de análisis de ambos regímenes "
+                    "con una sola carga de los datos."
+    )
+    parser.add_argument('steps', nargs='*',
+                        help=f"Etapas a ejecutar: {', '.join(STEPS)}")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    start = time.perf_counter()
+    results = run(args.steps or None, args.workers)
+    for regime in REGIMES:
+        if f'distribution_{regime}' in results:
+            print(f"Mejor distribución ({regime}): "
+                  f"{results[f'distribution_{regime}']['best']}")
+    print(f"Tiempo total de ejecución: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,12 @@
 import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-import numpy as np
 import time
 
+from densidad import binned_moments, box_stats, coarsen, density_stage
+
+# matplotlib y scipy se importan dentro de las funciones de
+# graficación, para no pagar su costo de importación al cargar el módulo
+
 
 def load_data():
     """Carga los datos desde la base de datos SQLite."""
@@ -16,33 +17,59 @@ def load_data():
     return df
 
 
-def plot_descriptive_graphs(data, variable):
-    """Genera gráficas descriptivas para la variable especificada."""
+def plot_descriptive_graphs(density, variable, bins=50):
+    """Genera gráficas descriptivas para la variable especificada.
+
+    Recibe el histograma y el KDE de ``densidad.density_stage`` en lugar
+    de la columna completa.
+    """
+    import matplotlib.pyplot as plt
+
+    counts, edges = coarsen(density.counts, density.edges, bins)
+    width = edges[1] - edges[0]
+    n = counts.sum()
+
     plt.figure(figsize=(12, 6))
-    # Histograma
-    plt.subplot(121)
-    sns.histplot(data[variable], kde=True, bins=50)
+    # Histograma, con el KDE escalado a conteos
+    ax = plt.subplot(121)
+    ax.stairs(counts, edges, fill=True, alpha=0.5)
+    ax.plot(density.kde_x, density.kde_y * n * width)
+    ax.set_xlabel(variable)
+    ax.set_ylabel('Count')
     plt.title(f'Histograma de {variable}')
     # Box plot
-    plt.subplot(122)
-    sns.boxplot(y=data[variable])
+    ax = plt.subplot(122)
+    ax.bxp([box_stats(density.counts, density.edges)], showfliers=True)
+    ax.set_ylabel(variable)
     plt.title(f'Box Plot de {variable}')
     plt.tight_layout()
     plt.savefig(f'{variable}_descriptive_graphs.png')
     plt.close()
 
 
-def plot_probability_model(data, variable):
-    """Genera un histograma con un modelo de probabilidad ajustado."""
+def plot_probability_model(density, variable, bins=50):
+    """Genera un histograma con un modelo de probabilidad ajustado.
+
+    Los parámetros se estiman con los momentos del histograma, que para
+    estas dos distribuciones coinciden con los de máxima verosimilitud.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from scipy import stats
+
+    counts, edges = coarsen(density.counts, density.edges, bins)
+    _, mean, std = binned_moments(density.counts, density.edges)
+
     plt.figure(figsize=(10, 6))
     # Crear el histograma
-    sns.histplot(data[variable], kde=True,
-                 stat="density", bins=50, label='Datos')
+    plt.stairs(counts / (counts.sum() * np.diff(edges)), edges, fill=True,
+               alpha=0.5, label='Datos')
+    plt.plot(density.kde_x, density.kde_y)
     # Ajustar y graficar el modelo de probabilidad
     if variable == 'variable_1':
         # Ajustar una distribución normal para variable_1
-        mu, std = stats.norm.fit(data[variable])
-        x = np.linspace(data[variable].min(), data[variable].max(), 100)
+        mu = mean
+        x = np.linspace(density.minimum, density.maximum, 100)
         p = stats.norm.pdf(x, mu, std)
         plt.plot(x, p, 'k', linewidth=2,
                  label='Modelo Normal')
@@ -50,10 +77,10 @@ def plot_probability_model(data, variable):
                   f'de Probabilidad Normal para {variable}')
     elif variable == 'variable_2':
         # Ajustar una distribución exponencial para variable_2
-        # Asegurarse de que todos los valores sean positivos
-        data_pos = data[variable] - data[variable].min() + 0.01
-        param = stats.expon.fit(data_pos)
-        x = np.linspace(data_pos.min(), data_pos.max(), 100)
+        # Asegurarse de que todos los valores sean positivos; el ajuste de
+        # máxima verosimilitud es loc = mínimo y scale = media - mínimo
+        param = (0.01, mean - density.minimum)
+        x = np.linspace(0.01, density.maximum - density.minimum + 0.01, 100)
         p = stats.expon.pdf(x, *param)
         plt.plot(x, p, 'k', linewidth=2, label='Modelo Exponencial')
         plt.title(f'Histograma y Modelo '
@@ -65,16 +92,15 @@ def plot_probability_model(data, variable):
 
 def main():
     start_time = time.time()
-    print("Cargando datos...")
-    df = load_data()
-    print(f"Datos cargados. Forma del DataFrame: {df.shape}")
-
     for variable in ['variable_1', 'variable_2']:
         print(f"\nAnalizando {variable}...")
+        # Histograma fino en SQL; las gráficas lo agrupan en 50 intervalos
+        density = density_stage('proyecto.db', column=variable, bins=1000)
+        print(f"Histograma calculado con {density.counts.sum()} muestras")
         print("Generando gráficas descriptivas...")
-        plot_descriptive_graphs(df, variable)
+        plot_descriptive_graphs(density, variable)
         print("Generando modelo de probabilidad...")
-        plot_probability_model(df, variable)
+        plot_probability_model(density, variable)
 
     end_time = time.time()
     print(f"\nTiempo total de ejecución: {end_time - start_time:.2f} segundos")
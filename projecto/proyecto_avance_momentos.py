@@ -1,17 +1,6 @@
-import sqlite3
-import pandas as pd
 import time
 
 
-def load_data():
-    """Carga los datos desde la base de datos SQLite."""
-    db_path = 'proyecto.db'
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM test_data", conn)
-    conn.close()
-    return df
-
-
 def calculate_moments(data, variable):
     """Devuelve los momentos estadísticos de la variable especificada."""
     return {
@@ -23,17 +12,28 @@ def calculate_moments(data, variable):
     }
 
 
+def calculate_running_moments(sunlight=None, group=None):
+    """Devuelve los momentos acumulados durante la recolección de datos.
+
+    Los lee de la tabla running_stats (ver estadisticas.py), sin recorrer
+    test_data.
+    """
+    from estadisticas import read_running_stats
+    from models import session_scope
+
+    with session_scope() as session:
+        moments = read_running_stats(session, group=group, sunlight=sunlight)
+    return moments.as_dict()
+
+
 def main():
     start_time = time.time()
-    print("Cargando datos...")
-    df = load_data()
-    print(f"Datos cargados. Forma del DataFrame: {df.shape}")
-
-    for variable in ['variable_1', 'variable_2']:
-        print(f"\nAnalizando {variable}...")
-        print("Calculando momentos estadísticos...")
-        moments = calculate_moments(df, variable)
-        print(f"Momentos estadísticos para {variable}:")
+    # Momentos acumulados en running_stats, sin cargar test_data (para
+    # sembrarlos en una base de datos con datos anteriores:
+    # python estadisticas.py --rebuild)
+    for name, sunlight in [("Total", None), ("Día", True), ("Noche", False)]:
+        print(f"\nMomentos estadísticos ({name}):")
+        moments = calculate_running_moments(sunlight=sunlight)
         for k, v in moments.items():
             print(f"{k}: {v:.4f}")
 
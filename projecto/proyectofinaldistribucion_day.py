@@ -1,35 +1,47 @@
-import sqlite3
 import pandas as pd
-from fitter import Fitter
-import matplotlib.pyplot as plt
 
-# Conexión a la base de datos SQLite
-conn = sqlite3.connect('day.db')
+from particiones import connect
+from seleccion_modelos import select_model
 
-# Cargar los datos desde la tabla "test_data" y la columna "data"
-query = "SELECT data FROM test_data"
-data = pd.read_sql_query(query, conn)["data"].dropna()
 
-# Cerrar la conexión
-conn.close()
+def main():
+    # Se ejecuta solamente como script: select_model crea procesos que
+    # vuelven a importar este módulo
+    # Conexión a la base de datos SQLite
+    conn = connect('proyecto.db')
 
-# Convertir los datos a tipo numérico si no lo son
-data = pd.to_numeric(data, errors='coerce').dropna()
+    # Cargar los datos de la partición "test_data_day" y la columna "data"
+    query = "SELECT data FROM test_data_day"
+    data = pd.read_sql_query(query, conn)["data"].dropna()
 
-# Definir las distribuciones a evaluar
-distribuciones = ['expon', 'gompertz', 'levy', 'logistic', 'norm', 'rayleigh']
+    # Cerrar la conexión
+    conn.close()
 
-# Ajustar las distribuciones con Fitter
-f = Fitter(data, distributions=distribuciones)
-f.fit()
+    # Convertir los datos a tipo numérico si no lo son
+    data = pd.to_numeric(data, errors='coerce').dropna()
 
-# Obtener la mejor distribución y sus parámetros
-best_fit = f.get_best()
+    # Definir las distribuciones a evaluar
+    distribuciones = ['expon', 'gompertz', 'levy', 'logistic', 'norm',
+                      'rayleigh']
 
-# Imprimir los resultados
-print("Mejor distribución encontrada:")
-print(best_fit)
+    # Ajustar las distribuciones en paralelo, cada una con un tiempo máximo
+    # (o leer el resultado del caché si estos mismos datos ya se ajustaron)
+    f = select_model(data, distribuciones)
 
-# Graficar las distribuciones ajustadas
-f.summary()
-plt.show()
+    # Obtener la mejor distribución y sus parámetros
+    best_fit = f.get_best()
+
+    # Imprimir los resultados
+    print("Mejor distribución encontrada:")
+    print(best_fit)
+
+    # Imprimir las métricas de las mejores distribuciones
+    print(f.summary())
+
+    # Graficar las distribuciones ajustadas y guardar el gráfico en un
+    # archivo PNG (sin abrir ventanas, para poder ejecutarlo sin pantalla)
+    f.plot("grafica_mejordistribucion_dia.png", dpi=300)
+
+
+if __name__ == "__main__":
+    main()
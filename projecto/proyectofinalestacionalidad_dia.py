@@ -1,37 +1,25 @@
 import sqlite3
-import pandas as pd
+
+from analisis import (autocorrelation_options, resample_mean,
+                      rolling_autocorrelations)
+from consultas import load_samples
 
 # Ruta a la base de datos proporcionada
-db_path = 'day.db'
-
-# Cargar los datos desde la base de datos original
-conn = sqlite3.connect(db_path)
-query = "SELECT timestamp, data FROM test_data;"
-df = pd.read_sql_query(query, conn)
-conn.close()
-
-# Convertir la columna 'timestamp' a tipo datetime y filtrar valores NULL
-df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-df = df.dropna(
-    subset=['timestamp', 'data']
-)
+db_path = 'proyecto.db'
+
+# Cargar los datos del régimen (con 'timestamp' ya convertido a fecha)
+df = load_samples(db_path, columns=('timestamp', 'data'), regime='day')
 
-# Convertir a índice de tiempo y muestrear cada 10 minutos
-df.set_index('timestamp', inplace=True)
-sampled_df = df.resample('10T').mean().reset_index()
-
-# Calcular la autocorrelación para cada muestra de 10 minutos
-autocorrelations = []
-for i in range(len(sampled_df)):
-    window = sampled_df['data'].iloc[max(0, i - 10):i+1]  # 10 muestras
-    if len(window) > 1:
-        autocorr = window.autocorr()  # Calcular la autocorrelación
-        autocorrelations.append(autocorr)
-    else:
-        autocorrelations.append(None)
-
-# Agregar autocorrelaciones al DataFrame muestreado
-sampled_df['autocorrelation'] = autocorrelations
+# Muestrear cada 10 minutos
+sampled_df = resample_mean(df, '10min')
+
+# Autocorrelación de cada muestra de 10 minutos con las 10 anteriores (o
+# la ventana y los retardos de la sección [analisis] de proyecto.cfg),
+# calculada para todas las ventanas a la vez
+window, lags = autocorrelation_options()
+sampled_df = sampled_df.join(
+    rolling_autocorrelations(sampled_df['data'], window, lags)
+)
 
 # Eliminar filas con valores NULL en las columnas calculadas
 filtered_df = sampled_df.dropna(subset=['data', 'autocorrelation'])
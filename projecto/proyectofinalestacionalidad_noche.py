@@ -1,19 +1,21 @@
 import sqlite3
 import pandas as pd
 
+from particiones import connect
+
 # Ruta a la base de datos original
-db_path = 'night.db'
+db_path = 'proyecto.db'
 
 # Cargar los datos desde la base de datos original
-conn = sqlite3.connect(db_path)
-query = "SELECT timestamp, data FROM test_data;"
+conn = connect(db_path)
+query = "SELECT timestamp, data FROM test_data_night;"
 df = pd.read_sql_query(query, conn)
 conn.close()
 
 # Convertir la columna 'timestamp' a tipo datetime y muestrear cada 10 minutos
 df['timestamp'] = pd.to_datetime(df['timestamp'])
 df.set_index('timestamp', inplace=True)
-sampled_df = df.resample('10T').mean().reset_index()
+sampled_df = df.resample('10min').mean().reset_index()
 
 # Guardar los datos muestreados en una nueva base de datos
 new_db_path = 'estacionalidad_night.db'
@@ -1,14 +1,15 @@
-import sqlite3
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from particiones import connect
+
 # Cargar la base de datos SQLite
-db_path = 'night.db'
+db_path = 'proyecto.db'
 
-# Leer los datos de la tabla 'test_data'
-with sqlite3.connect(db_path) as conn:
-    df = pd.read_sql_query("SELECT * FROM test_data;", conn)
+# Leer los datos de la partición 'test_data_night'
+with connect(db_path) as conn:
+    df = pd.read_sql_query("SELECT * FROM test_data_night;", conn)
 
 # Crear una nueva columna que representa los minutos desde la medianoche
 df['minutes_since_midnight'] = (
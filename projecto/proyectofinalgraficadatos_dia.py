@@ -1,10 +1,12 @@
 import sqlite3
 import pandas as pd
-from datetime import time
 import matplotlib.pyplot as plt
 import logging
 from pathlib import Path
 
+from consultas import build_query
+from particiones import connect
+
 
 def configure_logging():
     """Configura el sistema de logging."""
@@ -31,25 +33,26 @@ def connect_to_database(db_path):
                 f"No se encontró la base de datos en: {db_path}"
                 )
 
-        return sqlite3.connect(db_path)
+        return connect(db_path)
     except sqlite3.Error as e:
         logging.error(f"Error al conectar a la base de datos: {e}")
         raise
 
 
-def load_data(conn, query):
+def load_data(conn, query, params=None):
     """
     Carga datos desde la base de datos usando pandas.
 
     Args:
         conn (sqlite3.Connection): Conexión a la base de datos
         query (str): Consulta SQL para obtener los datos
+        params (list, optional): Parámetros de la consulta
 
     Returns:
         pd.DataFrame: DataFrame con los datos cargados
     """
     try:
-        return pd.read_sql_query(query, conn)
+        return pd.read_sql_query(query, conn, params=params)
     except pd.io.sql.DatabaseError as e:
         logging.error(f"Error al cargar datos: {e}")
         raise
@@ -69,12 +72,6 @@ def process_data(df):
         # Convertir 'timestamp' a datetime
         df['timestamp'] = pd.to_datetime(df['timestamp'])
 
-        # Filtrar datos entre las 6:00 AM y las 6:00 PM
-        df = df[
-            (df['timestamp'].dt.time >= time(6, 0)) &
-            (df['timestamp'].dt.time <= time(18, 0))
-        ]
-
         # Calcular minutos desde medianoche
         df['minutes'] = (
             df['timestamp'].dt.hour * 60 +
@@ -123,14 +120,20 @@ def main():
 
     try:
         # Configuración
-        db_path = 'day.db'  # Ruta al archivo cargado
-        query = "SELECT timestamp, data FROM test_data;"
+        db_path = 'proyecto.db'  # Ruta al archivo cargado
+        # Filtrar datos entre las 6:00 AM y las 6:00 PM en SQL
+        query, params = build_query(
+            columns=('timestamp', 'data'),
+            time_from='06:00',
+            time_to='18:00',
+            table='test_data_day'
+        )
         script_dir = Path(__file__).parent
         output_path = script_dir / 'graficadatos_dia.png'
 
         # Ejecutar el proceso
         with connect_to_database(db_path) as conn:
-            df_raw = load_data(conn, query)
+            df_raw = load_data(conn, query, params)
             df_processed = process_data(df_raw)
             create_plot(df_processed, output_path)
 
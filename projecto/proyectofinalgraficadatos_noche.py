@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import logging
 from pathlib import Path
 
+from particiones import connect
+
 
 def configure_logging():
     """Configura el sistema de logging."""
@@ -30,7 +32,7 @@ def connect_to_database(db_path):
                 f"No se encontró la base de datos en: {db_path}"
                 )
 
-        return sqlite3.connect(db_path)
+        return connect(db_path)
     except sqlite3.Error as e:
         logging.error(f"Error al conectar a la base de datos: {e}")
         raise
@@ -114,8 +116,8 @@ def main():
 
     try:
         # Configuración
-        db_path = 'night.db'
-        query = "SELECT timestamp, data FROM test_data;"
+        db_path = 'proyecto.db'
+        query = "SELECT timestamp, data FROM test_data_night;"
         script_dir = Path(__file__).parent
         output_path = script_dir / 'graficadatos_noche.png'
 
@@ -1,15 +1,10 @@
-import sqlite3
-import pandas as pd
+from estadisticas import read_running_stats
+from models import session_scope
 
-# Cargar los datos de la base de datos original
-db_path = 'proyecto.db'
-conn = sqlite3.connect(db_path)
-query = "SELECT data FROM test_data;"  # Ajustar según tu estructura de tabla
-df = pd.read_sql_query(query, conn)
-conn.close()
-
-# Calcular la potencia promedio
-df['data_squared'] = df['data'] ** 2
-average_power = df['data_squared'].mean()
+# Leer la potencia promedio de los momentos acumulados en running_stats,
+# sin recorrer test_data (para sembrarlos en una base de datos con datos
+# anteriores: python estadisticas.py --rebuild)
+with session_scope() as session:
+    average_power = read_running_stats(session).power
 
 print(f"La potencia promedio es: {average_power}")
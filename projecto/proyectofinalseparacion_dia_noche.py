@@ -5,74 +5,79 @@ input_db_path = 'proyecto.db'  # Base de datos original
 night_db_path = 'night.db'    # Base de datos para sunlight = 0
 day_db_path = 'day.db'        # Base de datos para sunlight = 1
 
-# Conectar a la base de datos original
-conn_input = sqlite3.connect(input_db_path)
-cursor_input = conn_input.cursor()
+# Tablas que solamente reciben filas nuevas (se copian de forma incremental)
+tables = ['test_data', 'packed_data']
 
-# Crear conexiones a las nuevas bases de datos
-conn_night = sqlite3.connect(night_db_path)
-cursor_night = conn_night.cursor()
-conn_day = sqlite3.connect(day_db_path)
-cursor_day = conn_day.cursor()
+# Conectar a la base de datos original y adjuntar las nuevas bases de datos,
+# de modo que la separación ocurra dentro de SQLite (INSERT ... SELECT)
+conn = sqlite3.connect(input_db_path)
+conn.execute("ATTACH DATABASE ? AS night", (night_db_path,))
+conn.execute("ATTACH DATABASE ? AS day", (day_db_path,))
+targets = {'night': 0, 'day': 1}  # Valor de 'sunlight' de cada base de datos
 
-# Obtener todas las tablas de la base de datos original
-cursor_input.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = cursor_input.fetchall()
+# Tabla con la última fila copiada (high-water mark) de cada tabla
+for target in targets:
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS {target}.split_state '
+        '(table_name TEXT PRIMARY KEY, last_rowid INTEGER)'
+    )
 
-# Procesar cada tabla
-for table_name in tables:
-    table_name = table_name[0]  # Nombre de la tabla
-    # Obtener los datos de la tabla
-    cursor_input.execute(f"SELECT * FROM '{table_name}'")
-    rows = cursor_input.fetchall()
-
-    # Obtener la estructura de la tabla
-    cursor_input.execute(f"PRAGMA table_info('{table_name}')")
-    columns_info = cursor_input.fetchall()
-    columns = [col[1] for col in columns_info]
-    columns_def = ", ".join([f'"{col[1]}" {col[2]}' for col in columns_info])
-
-    # Crear las tablas en las nuevas bases de datos
-    cursor_night.execute(
-        f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_def})'
-        )
-    cursor_day.execute(
-        f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_def})'
+with conn:
+    for table_name in tables:
+        # Obtener la estructura de la tabla
+        columns_info = conn.execute(
+            f"PRAGMA main.table_info('{table_name}')"
+        ).fetchall()
+        if not columns_info:
+            continue
+        columns = [col[1] for col in columns_info]
+        if 'sunlight' not in [col.lower() for col in columns]:
+            print(f"La tabla '{table_name}' no tiene una columna 'sunlight'.")
+            continue
+        columns_def = ", ".join(
+            [f'"{col[1]}" {col[2]}' for col in columns_info]
         )
+        columns_list = ", ".join([f'"{col}"' for col in columns])
 
-    # Identificar la columna 'sunlight'
-    sunlight_column_index = None
-    for idx, col in enumerate(columns_info):
-        if col[1].lower() == 'sunlight':
-            sunlight_column_index = idx
-            break
+        # Última fila disponible en este momento
+        max_rowid = conn.execute(
+            f'SELECT MAX(rowid) FROM main."{table_name}"'
+        ).fetchone()[0] or 0
 
-    if sunlight_column_index is None:
-        print(f"La tabla '{table_name}' no tiene una columna 'sunlight'.")
-        continue
+        for target, sunlight in targets.items():
+            # Crear la tabla en la nueva base de datos
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {target}."{table_name}" '
+                f'({columns_def})'
+            )
 
-    # Dividir los datos según el valor de 'sunlight'
-    night_rows = [
-        row for row in rows if row[sunlight_column_index] == 0
-        ]
-    day_rows = [
-        row for row in rows if row[sunlight_column_index] == 1
-        ]
+            state = conn.execute(
+                f'SELECT last_rowid FROM {target}.split_state '
+                'WHERE table_name = ?', (table_name,)
+            ).fetchone()
+            if state is None:
+                # Sin marca previa la tabla fue llenada por la versión
+                # anterior del script (con posibles duplicados): reconstruir
+                conn.execute(f'DELETE FROM {target}."{table_name}"')
+                last_rowid = 0
+            else:
+                last_rowid = state[0]
 
-    # Insertar los datos en las bases de datos correspondientes
-    placeholders = ", ".join(["?" for _ in columns])
-    cursor_night.executemany(
-        f'INSERT INTO "{table_name}" VALUES ({placeholders})', night_rows
-        )
-    cursor_day.executemany(
-        f'INSERT INTO "{table_name}" VALUES ({placeholders})', day_rows
-        )
+            # Copiar solamente las filas nuevas del régimen correspondiente
+            inserted = conn.execute(
+                f'INSERT INTO {target}."{table_name}" ({columns_list}) '
+                f'SELECT {columns_list} FROM main."{table_name}" '
+                'WHERE sunlight = ? AND rowid > ? AND rowid <= ?',
+                (sunlight, last_rowid, max_rowid)
+            ).rowcount
+            conn.execute(
+                f'INSERT OR REPLACE INTO {target}.split_state '
+                '(table_name, last_rowid) VALUES (?, ?)',
+                (table_name, max_rowid)
+            )
+            print(f"{table_name}: {inserted} filas nuevas en '{target}.db'.")
 
-# Confirmar cambios y cerrar conexiones
-conn_night.commit()
-conn_day.commit()
-conn_input.close()
-conn_night.close()
-conn_day.close()
+# Cerrar la conexión
+conn.close()
 
-print("Bases de datos creadas: 'night.db' y 'day.db'.")
+print("Bases de datos actualizadas: 'night.db' y 'day.db'.")
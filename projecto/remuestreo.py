@@ -0,0 +1,362 @@
+import argparse
+import configparser
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ergodicidad import DEFAULT_MEMBER, load_members
+from logistica import pad_groups
+
+
+# Arreglo compartido del proceso de trabajo (ver _init_worker)
+_shared = {}
+
+# Elementos máximos del arreglo remuestreado de cada tarea
+BATCH_ELEMENTS = 2 * 10**7
+
+
+def _mean(x):
+    return np.nanmean(x, axis=(1, 2))
+
+
+def _variance(x):
+    return np.nanvar(x, axis=(1, 2), ddof=1)
+
+
+def _autocorrelation(x):
+    # Pearson entre cada muestra y la anterior de su misma columna, con
+    # los pares centrados en sus medias (sin restar n * media**2)
+    current, previous = x[:, 1:], x[:, :-1]
+    valid = ~(np.isnan(current) | np.isnan(previous))
+    pairs = valid.sum(axis=(1, 2))
+    current = np.where(valid, current, 0)
+    previous = np.where(valid, previous, 0)
+    current = current - (current.sum(axis=(1, 2)) / pairs)[:, None, None]
+    previous = previous - (previous.sum(axis=(1, 2)) / pairs)[:, None, None]
+    current = np.where(valid, current, 0)
+    previous = np.where(valid, previous, 0)
+    return (current * previous).sum(axis=(1, 2)) / np.sqrt(
+        (current ** 2).sum(axis=(1, 2)) * (previous ** 2).sum(axis=(1, 2))
+    )
+
+
+# Estadísticos de un arreglo (réplicas, tiempo, columnas), con NaN en las
+# posiciones sin muestra; cada uno devuelve un valor por réplica
+STATISTICS = {
+    'mean': _mean,
+    'variance': _variance,
+    'autocorrelation': _autocorrelation,
+}
+
+
+def default_block(n):
+    """Longitud de bloque por defecto, ``n^(1/3)``."""
+    return max(1, round(n ** (1 / 3)))
+
+
+def resample_indices(n, replicates, rng, block=1):
+    """Índices de ``replicates`` remuestreos de ``n`` posiciones.
+
+    Con ``block=1`` es el bootstrap ordinario; con bloques más largos,
+    el bootstrap de bloques móviles, que concatena bloques de posiciones
+    consecutivas con inicio aleatorio y conserva la dependencia temporal
+    dentro de cada bloque.
+
+    Un bloque más largo que la serie se acorta a ``n``.
+
+    Returns
+    -------
+    np.ndarray
+        Arreglo ``(replicates, n)`` de índices.
+    """
+    if block < 1:
+        raise ValueError(f"Longitud de bloque inválida: {block}")
+    block = min(block, n)
+    if block == 1:
+        return rng.integers(0, n, size=(replicates, n))
+    blocks = -(-n // block)
+    starts = rng.integers(0, n - block + 1, size=(replicates, blocks))
+    indices = starts[:, :, np.newaxis] + np.arange(block)
+    return indices.reshape(replicates, -1)[:, :n]
+
+
+def _columns(selections, width):
+    """Convierte las columnas de cada selección en arreglos de índices."""
+    return {name: np.atleast_1d(np.arange(width)[columns])
+            for name, columns in selections.items()}
+
+
+def _init_worker(name, shape):
+    """Abre en cada proceso el bloque de memoria compartida."""
+    block = shared_memory.SharedMemory(name=name)
+    _shared['values'] = np.ndarray(shape, dtype=float, buffer=block.buf)
+    _shared['block'] = block
+
+
+def _replicate_chunk(args):
+    """Calcula los estadísticos de un lote de réplicas."""
+    statistics, selections, replicates, block, seed = args
+    values = _shared['values']
+    rng = np.random.default_rng(seed)
+    indices = resample_indices(len(values), replicates, rng, block)
+    results = {}
+    for name, columns in selections.items():
+        resampled = values[:, columns][indices]
+        for statistic in statistics:
+            results[f'{name}_{statistic}'] = STATISTICS[statistic](resampled)
+    return results
+
+
+def bootstrap(values, selections, statistics=('mean',), replicates=2000,
+              block=None, seed=None, workers=None, batch_size=None):
+    """Réplicas bootstrap de estadísticos de columnas de un arreglo.
+
+    Todas las réplicas de un lote se obtienen con un solo arreglo de
+    índices ``(réplicas, tiempo)`` (ver ``resample_indices``) y cada
+    estadístico se evalúa sobre todas a la vez. Las filas (el tiempo) se
+    remuestrean juntas en todas las columnas, de modo que los
+    estadísticos de distintas selecciones de una réplica son pareados.
+    Los lotes se reparten entre procesos, con el arreglo copiado una sola
+    vez a memoria compartida.
+
+    Parameters
+    ----------
+    values : array_like
+        Arreglo ``(tiempo, columnas)``, con NaN donde no hay muestra.
+    selections : dict
+        Nombre y columnas (índice, lista o ``slice``) de cada selección.
+    statistics : sequence of str
+        Estadísticos de ``STATISTICS``.
+    replicates : int
+        Número de réplicas.
+    block : int, optional
+        Longitud de bloque; por defecto, ``default_block``. Con 1 es el
+        bootstrap ordinario.
+    seed : int, optional
+        Semilla; cada lote usa una semilla derivada con ``SeedSequence``.
+    workers : int, optional
+        Número de procesos; por defecto, uno por núcleo.
+    batch_size : int, optional
+        Réplicas por lote; por defecto, las que caben en
+        ``BATCH_ELEMENTS`` elementos, repartidas entre los procesos.
+
+    Returns
+    -------
+    pd.DataFrame
+        Una fila por réplica y una columna ``<selección>_<estadístico>``.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    selections = _columns(selections, values.shape[1])
+    block = block or default_block(len(values))
+    workers = workers or os.cpu_count()
+
+    width = max(len(columns) for columns in selections.values())
+    batch_size = batch_size or max(1, min(
+        BATCH_ELEMENTS // (len(values) * width),
+        -(-replicates // workers),
+    ))
+    sizes = [min(batch_size, replicates - start)
+             for start in range(0, replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(tuple(statistics), selections, size, block, child)
+            for size, child in zip(sizes, seeds)]
+
+    if workers == 1:
+        _shared['values'] = values
+        try:
+            chunks = [_replicate_chunk(job) for job in jobs]
+        finally:
+            _shared.clear()
+    else:
+        block_memory = shared_memory.SharedMemory(create=True,
+                                                  size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=float,
+                       buffer=block_memory.buf)[:] = values
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(block_memory.name, values.shape),
+            ) as executor:
+                chunks = list(executor.map(_replicate_chunk, jobs))
+        finally:
+            block_memory.close()
+            block_memory.unlink()
+
+    return pd.DataFrame({key: np.concatenate([chunk[key]
+                                              for chunk in chunks])
+                         for key in chunks[0]})
+
+
+def contrast_test(observed, replicated, null=0.0, confidence=0.95):
+    """Intervalo percentil y valor p bootstrap de un contraste.
+
+    El valor p es la fracción de réplicas centradas en ``observed`` que
+    se alejan de él al menos tanto como ``observed`` se aleja de
+    ``null``.
+    """
+    replicated = np.asarray(replicated)
+    replicated = replicated[np.isfinite(replicated)]
+    alpha = 1 - confidence
+    low, high = np.quantile(replicated, [alpha / 2, 1 - alpha / 2])
+    extreme = np.abs(replicated - observed) >= abs(observed - null)
+    pvalue = (extreme.sum() + 1) / (len(replicated) + 1)
+    return low, high, pvalue
+
+
+def _report(observed, replicated, first, second, statistics, confidence):
+    """Tabla de los contrastes ``second - first`` de cada estadístico."""
+    rows = []
+    for statistic in statistics:
+        a = observed[f'{first}_{statistic}'].iloc[0]
+        b = observed[f'{second}_{statistic}'].iloc[0]
+        contrast = (replicated[f'{second}_{statistic}']
+                    - replicated[f'{first}_{statistic}'])
+        low, high, pvalue = contrast_test(b - a, contrast,
+                                          confidence=confidence)
+        rows.append((statistic, a, b, b - a, low, high, pvalue))
+    report = pd.DataFrame(rows, columns=['statistic', first, second,
+                                         'difference', 'ci_low', 'ci_high',
+                                         'pvalue'])
+    report['consistent'] = report['pvalue'] >= 1 - confidence
+    return report
+
+
+def _observed(values, selections, statistics):
+    """Estadísticos de los datos originales, como en ``bootstrap``."""
+    selections = _columns(selections, values.shape[1])
+    values = values[np.newaxis]
+    return pd.DataFrame({
+        f'{name}_{statistic}': STATISTICS[statistic](values[:, :, columns])
+        for name, columns in selections.items() for statistic in statistics
+    })
+
+
+def ergodicity_test(matrix, member=DEFAULT_MEMBER,
+                    statistics=tuple(STATISTICS), confidence=0.95,
+                    **options):
+    """Prueba bootstrap de ergodicidad de una realización.
+
+    Compara cada estadístico de la realización ``member`` (su promedio
+    temporal, varianza y autocorrelación) con el del ensamble completo.
+    Los timestamps se remuestrean por bloques, los mismos para todas las
+    realizaciones.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Arreglo ``(timestamps, realizaciones)`` (ver ``member_matrix``).
+    member : int
+        Realización a comparar.
+    statistics : sequence of str
+        Estadísticos de ``STATISTICS``.
+    confidence : float
+        Nivel de confianza de los intervalos.
+    **options
+        Opciones de ``bootstrap``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Por estadístico: el valor del ensamble y de la realización, su
+        diferencia, el intervalo de la diferencia, el valor p y si la
+        diferencia es consistente con cero.
+    """
+    selections = {'ensemble': slice(None), 'member': member}
+    replicated = bootstrap(matrix, selections, statistics, **options)
+    observed = _observed(matrix, selections, statistics)
+    return _report(observed, replicated, 'ensemble', 'member', statistics,
+                   confidence)
+
+
+def stationarity_test(matrix, statistics=tuple(STATISTICS),
+                      confidence=0.95, **options):
+    """Prueba bootstrap de estacionariedad entre dos mitades del tiempo.
+
+    Compara cada estadístico de la primera mitad de los timestamps con
+    el de la segunda, con todas las realizaciones. Las dos mitades se
+    acomodan lado a lado y se remuestrean con los mismos bloques.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Arreglo ``(timestamps, realizaciones)`` (ver ``member_matrix``).
+    statistics, confidence, **options
+        Ver ``ergodicity_test``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Como ``ergodicity_test``, con las columnas ``first`` y ``second``.
+    """
+    half, width = len(matrix) // 2, matrix.shape[1]
+    halves = np.hstack([matrix[:half], matrix[half:2 * half]])
+    selections = {'first': slice(0, width), 'second': slice(width, None)}
+    replicated = bootstrap(halves, selections, statistics, **options)
+    observed = _observed(halves, selections, statistics)
+    return _report(observed, replicated, 'first', 'second', statistics,
+                   confidence)
+
+
+def member_matrix(members):
+    """Arreglo ``(timestamps, realizaciones)`` con NaN donde falta muestra.
+
+    Parameters
+    ----------
+    members : pd.DataFrame
+        Columnas ``timestamp`` y ``data`` (y ``member``, opcional), con
+        las muestras de cada timestamp en orden de realización.
+    """
+    if 'member' in members:
+        members = members.sort_values(['timestamp', 'member'])
+    _, padded, mask = pad_groups(members['timestamp'].to_numpy(),
+                                 members['data'].to_numpy())
+    return np.where(mask, padded, np.nan)
+
+
+def main():
+    config = configparser.ConfigParser()
+    config.read("proyecto.cfg")
+
+    parser = argparse.ArgumentParser(
+        description="Pruebas bootstrap de ergodicidad y estacionariedad de "
+                    "un régimen."
+    )
+    parser.add_argument("--regime", choices=["day", "night"], default="day")
+    parser.add_argument("--db", default="proyecto.db")
+    parser.add_argument("--test", choices=["ergodicity", "stationarity",
+                                           "both"], default="both")
+    parser.add_argument("--member", type=int, default=DEFAULT_MEMBER)
+    parser.add_argument("--replicates", type=int, default=2000)
+    parser.add_argument("--block", type=int, default=None,
+                        help="Longitud de bloque (1 sin bloques)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int,
+                        default=config.getint("analisis", "workers",
+                                              fallback=None))
+    args = parser.parse_args()
+
+    matrix = member_matrix(load_members(args.db, args.regime))
+    options = dict(confidence=args.confidence, replicates=args.replicates,
+                   block=args.block, seed=args.seed, workers=args.workers)
+    tests = {"ergodicity": lambda: ergodicity_test(matrix, args.member,
+                                                   **options),
+             "stationarity": lambda: stationarity_test(matrix, **options)}
+    for name, test in tests.items():
+        if args.test in (name, "both"):
+            start = time.perf_counter()
+            report = test()
+            print(f"{name} ({args.replicates} réplicas, "
+                  f"{time.perf_counter() - start:.2f} s)")
+            print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import argparse
+import multiprocessing
+import time
+import warnings
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+from analisis import DISTRIBUTIONS
+from cache_ajustes import FitCache, default_cache
+
+# Tiempo máximo de ajuste de cada familia, en segundos
+DEFAULT_TIMEOUT = 30
+
+# Métricas de bondad de ajuste, con los mismos nombres que Fitter
+METRICS = ['sumsquare_error', 'aic', 'bic', 'kl_div', 'ks_statistic',
+           'ks_pvalue']
+
+
+def fit_family(name, data, x, y):
+    """Ajusta una familia y calcula sus métricas de bondad de ajuste.
+
+    Las métricas se calculan igual que en ``Fitter``: el error cuadrático
+    contra el histograma normalizado ``(x, y)``, AIC y BIC con la
+    verosimilitud de los datos, la divergencia de Kullback-Leibler y la
+    prueba de Kolmogorov-Smirnov.
+
+    Returns
+    -------
+    tuple
+        Los parámetros ajustados y un diccionario con las métricas.
+    """
+    from scipy import stats
+
+    warnings.filterwarnings('ignore', category=RuntimeWarning)
+    dist = getattr(stats, name)
+    params = dist.fit(data)
+    pdf = dist.pdf(x, *params)
+    log_likelihood = np.sum(dist.logpdf(data, *params))
+    k, n = len(params), len(data)
+    ks_statistic, ks_pvalue = stats.kstest(data, dist(*params).cdf)
+    return tuple(float(p) for p in params), {
+        'sumsquare_error': float(np.sum((pdf - y) ** 2)),
+        'aic': float(2 * k - 2 * log_likelihood),
+        'bic': float(k * np.log(n) - 2 * log_likelihood),
+        'kl_div': float(stats.entropy(pdf + 1e-10, y + 1e-10)),
+        'ks_statistic': float(ks_statistic),
+        'ks_pvalue': float(ks_pvalue),
+    }
+
+
+def _process_context():
+    """Contexto de ``multiprocessing`` de los procesos de ajuste.
+
+    No se usa ``fork``: ``select_model`` puede llamarse desde un hilo (por
+    ejemplo, en una etapa de ``pipeline.py``), y copiar un proceso con
+    varios hilos puede dejar bloqueados los candados que otros hilos
+    tenían tomados. Con ``forkserver``, cada proceso se copia de un
+    servidor de un solo hilo que ya importó ``scipy.stats``, así que la
+    importación no se cuenta en el tiempo de cada familia; donde no
+    existe (Windows) se usa ``spawn``.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["scipy.stats", __name__])
+    return context
+
+
+def _fit_worker(conn, name, data, x, y):
+    """Ajusta una familia en un proceso y envía el resultado por ``conn``."""
+    try:
+        conn.send(fit_family(name, data, x, y))
+    except Exception as e:
+        conn.send(f"{type(e).__name__}: {e}")
+    finally:
+        conn.close()
+
+
+class ModelSelection:
+    """Resultado de la búsqueda de la mejor distribución.
+
+    Tiene la misma interfaz que ``Fitter`` para consultar los resultados
+    (``fitted_param``, ``fitted_pdf``, ``df_errors``, ``get_best()`` y
+    ``summary()``), además del estado y la duración del ajuste de cada
+    familia: ``"ok"``, ``"timeout"``, ``"error"`` o ``"skipped"`` (no se
+    terminó de ajustar porque ya había un ganador claro).
+    """
+
+    def __init__(self, data, distributions, bins=100):
+        self.data = np.asarray(data, dtype=float)
+        self.distributions = list(distributions)
+        self.bins = bins
+        self.y, edges = np.histogram(self.data, bins=bins, density=True)
+        self.x = (edges[:-1] + edges[1:]) / 2
+        self.fitted_param = {}
+        self.status = {}
+        self.elapsed = {}
+        self._metrics = {}
+
+    @property
+    def fitted_pdf(self):
+        """PDF de cada familia ajustada en los centros del histograma."""
+        from scipy import stats
+
+        return {name: getattr(stats, name).pdf(self.x, *params)
+                for name, params in self.fitted_param.items()}
+
+    @property
+    def df_errors(self):
+        """Métricas de cada familia; infinitas si no se pudo ajustar."""
+        failed = dict.fromkeys(METRICS, np.inf) | {'ks_pvalue': 0.0}
+        return pd.DataFrame.from_dict(
+            {name: self._metrics.get(name, failed)
+             for name in self.distributions},
+            orient='index', columns=METRICS,
+        ).sort_index()
+
+    def ranking(self, method='sumsquare_error'):
+        """Familias ordenadas de la mejor a la peor según ``method``."""
+        return self.df_errors.sort_values(
+            by=method, ascending=(method != 'ks_pvalue')
+        ).index
+
+    def get_best(self, method='sumsquare_error'):
+        """Mejor familia y sus parámetros, como ``Fitter.get_best``."""
+        from scipy import stats
+
+        if not self.fitted_param:
+            raise ValueError("Ninguna distribución se pudo ajustar")
+        name = self.ranking(method)[0]
+        shapes = getattr(stats, name).shapes
+        names = [*(shapes.split(', ') if shapes else []), 'loc', 'scale']
+        return {name: dict(zip(names, self.fitted_param[name]))}
+
+    def summary(self, Nbest=5, method='sumsquare_error'):
+        """Tabla de métricas de las ``Nbest`` mejores familias.
+
+        A diferencia de ``Fitter.summary``, no grafica (ver ``plot``).
+        """
+        return self.df_errors.loc[self.ranking(method)[:Nbest]]
+
+    def plot(self, path, Nbest=5, method='sumsquare_error', dpi=300):
+        """Guarda el histograma con las PDF de las ``Nbest`` mejores.
+
+        Usa ``Figure`` directamente (sin ``pyplot``), así que no abre
+        ventanas y funciona sin pantalla.
+        """
+        from matplotlib.figure import Figure
+
+        figure = Figure()
+        axes = figure.subplots()
+        axes.hist(self.data, bins=self.bins, density=True)
+        pdfs = self.fitted_pdf
+        for name in self.ranking(method)[:Nbest]:
+            if name in pdfs:
+                axes.plot(self.x, pdfs[name], lw=2, label=name)
+        axes.grid(True)
+        axes.legend()
+        figure.savefig(path, dpi=dpi)
+
+    def record(self, name, params, metrics):
+        """Registra el ajuste exitoso de una familia."""
+        self.fitted_param[name] = params
+        self._metrics[name] = metrics
+        self.status[name] = 'ok'
+
+    def clear_winner(self, method='sumsquare_error', pvalue=0.05,
+                     margin=10):
+        """Indica si ya hay un ganador claro entre las familias ajustadas.
+
+        Lo hay cuando la mejor familia no se rechaza en la prueba de
+        Kolmogorov-Smirnov (``ks_pvalue >= pvalue``) y su error es al
+        menos ``margin`` veces menor que el de la segunda.
+        """
+        fitted = self.df_errors.loc[list(self._metrics)]
+        if len(fitted) < 2:
+            return False
+        ranked = fitted.sort_values(by=method)
+        best, second = ranked.iloc[0], ranked.iloc[1]
+        return (best['ks_pvalue'] >= pvalue
+                and best[method] * margin <= second[method])
+
+    def to_entry(self):
+        """Entrada del caché, con el formato de ``cache_ajustes`` más el
+        estado de cada familia."""
+        return {
+            'fitted_param': {name: list(params)
+                             for name, params in self.fitted_param.items()},
+            'df_errors': self.df_errors.to_dict(orient='split'),
+            'status': dict(self.status),
+        }
+
+    def load_entry(self, entry):
+        """Restablece los resultados y el estado de una entrada del caché."""
+        errors = pd.DataFrame(**entry['df_errors'])
+        for name, params in entry['fitted_param'].items():
+            self.record(name, tuple(params), errors.loc[name].to_dict())
+        self.status.update(entry['status'])
+        self.elapsed.update(dict.fromkeys(self.status, 0.0))
+
+
+def select_model(data, distributions=DISTRIBUTIONS, timeout=DEFAULT_TIMEOUT,
+                 workers=None, bins=100, early_stop=None,
+                 method='sumsquare_error', margin=10, cache=None):
+    """Ajusta las familias candidatas en paralelo y las ordena.
+
+    Cada familia se ajusta en su propio proceso, con hasta ``workers``
+    procesos al mismo tiempo. Un proceso que supera el tiempo de su
+    familia se termina y la familia queda con métricas infinitas, como
+    las que fallan en ``Fitter``.
+
+    Parameters
+    ----------
+    data : array_like
+        Datos a ajustar.
+    distributions : list of str
+        Familias candidatas de ``scipy.stats``.
+    timeout : float or dict
+        Segundos máximos de ajuste, uno para todas las familias o un
+        diccionario por familia (las que falten usan ``DEFAULT_TIMEOUT``).
+    workers : int, optional
+        Número de procesos; por defecto, uno por núcleo.
+    bins : int
+        Número de intervalos del histograma.
+    early_stop : float, optional
+        Si se da, la búsqueda termina en cuanto hay un ganador claro (ver
+        ``ModelSelection.clear_winner``, con ``pvalue=early_stop``) y las
+        familias pendientes quedan como ``"skipped"``.
+    method : str
+        Métrica para el ganador claro.
+    margin : float
+        Ver ``ModelSelection.clear_winner``.
+    cache : FitCache or bool, optional
+        Caché de resultados (ver ``cache_ajustes``); por defecto,
+        ``default_cache()``. Con ``False`` no se usa. Solamente se
+        guardan las búsquedas en que todas las familias terminaron (con
+        estado ``"ok"`` o ``"error"``, que se guarda en la entrada); un
+        ``"timeout"`` o ``"skipped"`` depende de la carga de la máquina.
+
+    Returns
+    -------
+    ModelSelection
+        Resultados de la búsqueda.
+    """
+    result = ModelSelection(data, distributions, bins)
+    if cache is None:
+        cache = default_cache()
+    # Las entradas de select_model tienen su propio espacio de llaves, para
+    # no leer las de otros formatos guardadas en el mismo directorio
+    key = FitCache.key(result.data, distributions, bins=bins,
+                       producer='select_model')
+    entry = cache.get(key) if cache else None
+    if entry is not None:
+        result.load_entry(entry)
+        return result
+
+    if not isinstance(timeout, dict):
+        timeout = dict.fromkeys(distributions, timeout)
+    workers = workers or multiprocessing.cpu_count()
+    context = _process_context()
+    pending, running = list(distributions), {}
+
+    def stop(name, status):
+        process, conn, _, start = running.pop(name)
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        conn.close()
+        result.status.setdefault(name, status)
+        result.elapsed[name] = time.monotonic() - start
+
+    while pending or running:
+        while pending and len(running) < workers:
+            name = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_fit_worker,
+                args=(sender, name, result.data, result.x, result.y),
+                daemon=True,
+            )
+            # start() espera a que el servidor tenga el proceso (y, la
+            # primera vez, a que importe scipy.stats): se cuenta después
+            process.start()
+            start = time.monotonic()
+            sender.close()
+            deadline = start + timeout.get(name, DEFAULT_TIMEOUT)
+            running[name] = (process, receiver, deadline, start)
+
+        now = time.monotonic()
+        next_deadline = min(deadline for _, _, deadline, _ in
+                            running.values())
+        ready = wait([conn for _, conn, _, _ in running.values()],
+                     timeout=max(0, next_deadline - now))
+
+        for name, (process, conn, deadline, _) in list(running.items()):
+            if conn in ready:
+                try:
+                    value = conn.recv()
+                except EOFError:
+                    value = "el proceso terminó sin resultado"
+                if isinstance(value, tuple):
+                    result.record(name, *value)
+                stop(name, 'error')
+            elif time.monotonic() >= deadline:
+                stop(name, 'timeout')
+
+        if early_stop is not None and result.clear_winner(
+                method, early_stop, margin):
+            for name in list(running):
+                stop(name, 'skipped')
+            for name in pending:
+                result.status[name] = 'skipped'
+            pending = []
+
+    if cache and all(s in ('ok', 'error') for s in result.status.values()):
+        cache.put(key, result.to_entry())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Busca la distribución que mejor se ajusta a los datos "
+                    "de un régimen, ajustando las familias en paralelo."
+    )
+    parser.add_argument('--regime', choices=['day', 'night'], default='day')
+    parser.add_argument('--db', default='proyecto.db')
+    parser.add_argument('--distributions', nargs='+', default=DISTRIBUTIONS)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="Segundos máximos por familia")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--early-stop', type=float, default=None,
+                        help="Valor p de KS para detenerse con un ganador "
+                             "claro")
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--plot', help="Archivo PNG de la gráfica")
+    args = parser.parse_args()
+
+    from consultas import load_samples
+
+    data = load_samples(args.db, columns=('data',),
+                        regime=args.regime)['data'].dropna()
+    start = time.perf_counter()
+    result = select_model(data, args.distributions, args.timeout,
+                          args.workers, early_stop=args.early_stop,
+                          cache=False if args.no_cache else None)
+    elapsed = time.perf_counter() - start
+
+    print("Mejor distribución encontrada:")
+    print(result.get_best())
+    print(result.summary().to_string())
+    for name in args.distributions:
+        print(f"{name:>10}: {result.status.get(name, '-'):>8} "
+              f"{result.elapsed.get(name, 0):.2f} s")
+    print(f"Tiempo total: {elapsed:.2f} s")
+    if args.plot:
+        result.plot(args.plot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """Responde como la API del proyecto, con datos sintéticos."""
+
+    protocol_version = "HTTP/1.1"  # Permite conexiones keep-alive
+    delay = 0.0
+    sample_size = 10
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if "grupo" not in query:
+            self.send_error(400, "Falta el parámetro 'grupo'")
+            return
+
+        time.sleep(self.delay)
+        now = datetime.now()
+        sunlight = 6 <= now.hour < 18
+        body = json.dumps({
+            "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "sample_size": self.sample_size,
+            "sunlight": sunlight,
+            "data": [random.gauss(0, 1) for _ in range(self.sample_size)],
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host="127.0.0.1", port=0, delay=0.0, sample_size=10):
+    """Inicia el servidor local de prueba en un hilo aparte.
+
+    Parameters
+    ----------
+    host : str
+        Dirección de escucha.
+    port : int
+        Puerto de escucha; ``0`` elige uno libre.
+    delay : float
+        Retardo artificial de cada respuesta, en segundos.
+    sample_size : int
+        Número de muestras por respuesta.
+
+    Returns
+    -------
+    tuple
+        El servidor (para llamar ``shutdown()``) y la URL de la API.
+    """
+    handler = type("Handler", (APIHandler,),
+                   {"delay": delay, "sample_size": sample_size})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://{host}:{server.server_address[1]}/api/proceso"
+    return server, url
+
+
+if __name__ == "__main__":
+    server, url = start_server(port=8080)
+    print(f"Servidor de prueba en {url} (Ctrl + C para detener)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
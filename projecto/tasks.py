@@ -1,18 +1,59 @@
 from celery import Celery
 from celery.schedules import timedelta
-from datetime import datetime
-import requests
-import json
 import configparser
-import logging
 
-from models import session, TestData
+from models import PackedData, TestData, get_engine, session_scope
+from ingesta import (
+    build_packed_record, build_records, drop_stored, write_packed,
+    write_records
+)
+from cliente_api import fetch, fetch_many
+from estadisticas import update_running_stats
+import buffer_redis
 
 
 # Crear "app" de Celery
 app = Celery("tasks", broker="redis://localhost")
 
 
+def store(responses):
+    """Almacena respuestas de la API según el formato configurado.
+
+    Las muestras y la actualización de ``running_stats`` se escriben en
+    la misma transacción, así que los acumuladores no pueden quedar
+    desfasados de los datos si la tarea falla a la mitad. Las
+    realizaciones que ya estaban guardadas se ignoran (ver
+    ``ingesta.drop_stored``), de modo que repetir un lote no tiene
+    efecto.
+
+    Parameters
+    ----------
+    responses : list of tuple
+        Pares ``(group, data)`` con las respuestas decodificadas.
+    """
+    with session_scope() as session:
+        model = PackedData if storage == "packed" else TestData
+        responses = drop_stored(responses, session, model)
+        if storage == "packed":
+            write_packed(
+                [build_packed_record(data, group)
+                 for group, data in responses],
+                get_engine(), session,
+            )
+        else:
+            records = []
+            for group, data in responses:
+                records.extend(build_records(data, group))
+            write_records(records, get_engine(), session, mode=write_mode)
+
+        # Actualizar los momentos acumulados de cada grupo, régimen y hora
+        for group, data in responses:
+            update_running_stats(
+                session, group, data["timestamp"], data["sunlight"],
+                data["data"][:data["sample_size"]],
+            )
+
+
 # Configurar las tareas de Celery
 @app.task
 def test_task(url, group):
@@ -31,30 +72,81 @@ def test_task(url, group):
     str
         Mensaje de éxito.
     """
-    params = {"grupo": int(group)}
-    response = requests.get(url, params=params)
-
-    if response.status_code == 200:
-        data = json.loads(response.text)
-
-        timestamp = datetime.strptime(data["timestamp"], "%Y-%m-%d %H:%M:%S")
-        sample_size = data["sample_size"]
-        sunlight = data["sunlight"]
-        for sample in range(sample_size):
-            record = TestData(
-                group=group,
-                timestamp=timestamp,
-                data=data["data"][sample],
-                sunlight=sunlight,
-            )
-            session.add(record)
-            session.commit()
+    data = fetch(url, group, timeout=timeout)
+
+    if data is not None:
+        store([(group, data)])
         return "¡Hola mundo!"
     else:
-        logging.error(f"Error {response.status_code}: {response.text}")
         return "Algo falló en la solicitud de datos."
 
 
+@app.task
+def fetch_groups_task(url, groups):
+    """Descarga simultáneamente los datos de varios grupos y los almacena.
+
+    Parameters
+    ----------
+    url : str
+        URL de la API.
+    groups : list of str
+        Números de grupo a consultar.
+
+    Returns
+    -------
+    str
+        Resumen de las solicitudes exitosas.
+    """
+    results = fetch_many(url, groups, timeout=timeout,
+                         concurrency=concurrency)
+    store([(group, data) for group, data in results if data is not None])
+    succeeded = sum(data is not None for _, data in results)
+    return f"{succeeded} de {len(groups)} grupos descargados."
+
+
+@app.task
+def buffered_fetch_task(url, groups):
+    """Descarga los datos de varios grupos y los deja en el buffer de Redis.
+
+    No escribe en la base de datos: ``flush_task`` lo hace en lotes. Si el
+    buffer alcanza ``flush_size`` respuestas, solicita un vaciado.
+
+    Parameters
+    ----------
+    url : str
+        URL de la API.
+    groups : list of str
+        Números de grupo a consultar.
+
+    Returns
+    -------
+    str
+        Resumen de las solicitudes exitosas.
+    """
+    results = fetch_many(url, groups, timeout=timeout,
+                         concurrency=concurrency)
+    responses = [(group, data) for group, data in results if data is not None]
+    client = buffer_redis.get_client(buffer_url)
+    length = buffer_redis.push(client, buffer_key, responses)
+    if length >= flush_size:
+        flush_task.delay()
+    return f"{len(responses)} de {len(groups)} grupos en el buffer."
+
+
+@app.task
+def flush_task():
+    """Escribe en la base de datos las respuestas acumuladas en Redis.
+
+    Returns
+    -------
+    str
+        Número de respuestas escritas.
+    """
+    client = buffer_redis.get_client(buffer_url)
+    written = buffer_redis.drain(client, buffer_key, flush_size, store)
+    return f"{written} respuestas escritas desde el buffer."
+
+
 @app.task
 def schedule_task():
     return "¡Hola gente cada 60 minutos!"
@@ -70,6 +162,19 @@ config.read("proyecto.cfg")
 url = config["api"]["url"]
 group = config["api"]["group"]
 period = int(config["scheduler"]["period"])
+write_mode = config["db"].get("write_mode", "bulk")
+storage = config["db"].get("storage", "rows")
+timeout = (
+    config["api"].getfloat("connect_timeout", 3.05),
+    config["api"].getfloat("read_timeout", 10),
+)
+concurrency = config["api"].getint("concurrency", 8)
+groups = [g.strip() for g in config["api"].get("groups", group).split(",")]
+buffer_enabled = config.getboolean("buffer", "enabled", fallback=False)
+buffer_url = config.get("buffer", "url", fallback="redis://localhost")
+buffer_key = config.get("buffer", "key", fallback="proyecto:payloads")
+flush_size = config.getint("buffer", "flush_size", fallback=500)
+flush_interval = config.getint("buffer", "flush_interval", fallback=60)
 
 # Configurar el planificador de tareas de Celery
 app.conf.beat_schedule = {
@@ -83,3 +188,24 @@ app.conf.beat_schedule = {
         "schedule": timedelta(minutes=60),
     },
 }
+
+# Con varios grupos configurados, consultarlos todos desde un solo proceso
+if "groups" in config["api"]:
+    app.conf.beat_schedule["test-schedule"] = {
+        "task": "tasks.fetch_groups_task",
+        "args": (url, groups),
+        "schedule": timedelta(seconds=period),
+    }
+
+# Con el buffer de Redis, la consulta solo encola y el vaciado escribe en
+# lotes, por tamaño (desde buffered_fetch_task) o por tiempo (aquí)
+if buffer_enabled:
+    app.conf.beat_schedule["test-schedule"] = {
+        "task": "tasks.buffered_fetch_task",
+        "args": (url, groups),
+        "schedule": timedelta(seconds=period),
+    }
+    app.conf.beat_schedule["flush-schedule"] = {
+        "task": "tasks.flush_task",
+        "schedule": timedelta(seconds=flush_interval),
+    }